@@ -1,27 +1,39 @@
 # implemented libs
-from tokenizer import tokenizer, stack
+from assembler.source_map import create_source_marker
+from tokenizer import stack, peephole, pipeline
 
 # std-libs
 import argparse
 import os
+import time
 
 
 def main():
     arguments_list = [
-        {'name':'file_path','type':str,'help':'specifies the file / directory to be read'}        
+        {'name':'file_path','type':str,'help':'specifies the file / directory to be read'},
+        {'name':'--optimize','action':'store_true','help':'runs peephole optimizer over generated assembly'},
+        {'name':'--compact-calls','action':'store_true','help':'emits call / return frame handling once as shared routines'},
+        {'name':'--compact-comparisons','action':'store_true','help':'emits eq / gt / lt once as shared routines'},
+        {'name':'--jobs','type':int,'default':1,'help':'number of worker processes translating .vm files, 0 uses the number of CPUs'},
+        {'name':'--memoize','action':'store_true','help':'caches emitted assembly of repeated VM commands and prints cache hit rates'},
+        {'name':'--timings','action':'store_true','help':'prints time spent on each translation stage'},
+        {'name':'--source-map','action':'store_true','help':'writes source markers the assembler turns into a ROM -> VM command map for the profiler, not available with --optimize'},
+        {'name':'--batch-pushes','action':'store_true','help':'writes consecutive push constant and function locals with a single SP update'},
     ]
 
     parser = argparse.ArgumentParser()
 
     for arg in arguments_list:
         parser.add_argument(
-            arg['name'],type=arg['type'],help=arg['help']
+            arg.pop('name'),**arg
         )
 
     args = parser.parse_args()
 
-    path = os.path.split(args.file_path)    
-    code_lines = []
+    if args.source_map and args.optimize:
+        parser.error('--source-map can\'t be used with --optimize, since peephole rules rewrite code across VM commands')
+
+    path = os.path.split(args.file_path)
 
     stack_operation = stack.Stack(
         file_name   = os.path.splitext(path[-1])[0] if not os.path.isdir(args.file_path) else path[1],                      # file_path for STATIC segment
@@ -31,50 +43,55 @@ def main():
         THIS        = stack.Pointer(3,3000),            # THIS
         THAT        = stack.Pointer(4,3010),            # THAT
         TEMP        = stack.Pointer(5,5),               # TEMP
-        POINTER     = stack.Pointer(3,3)                # POINTER
+        POINTER     = stack.Pointer(3,3),               # POINTER
+        COMPACT_CALLS = args.compact_calls,
+        COMPACT_COMPARISONS = args.compact_comparisons,
+        BATCH_PUSHES = args.batch_pushes,
+        CODE_CACHE = stack.CodeCache() if args.memoize else None
     )
 
-    code_lines = []
+    start = time.perf_counter()
+    timer = pipeline.StageTimer() if args.timings else None
+
+    # shared routines have no VM command of their own
+    shared_routines = ([create_source_marker()] if args.source_map else []) + stack_operation.create_shared_routines()
 
-    #print(path,os.path.isdir(args.file_path),os.path.splitext(path[-1]))
     if not os.path.isdir(args.file_path):
-        with open(f'{args.file_path}','r') as input_fp:
-            code_lines = [line.strip() for line in input_fp.readlines()]
         file_output = os.path.splitext(path[-1])[0]
-        output_path = f'{path[0]}/{file_output}.asm'
-        generated_code = []
+        output_path = f'{path[0] or "."}/{file_output}.asm'
+        files = [(file_output, args.file_path)]
+        prologue = []
+        # without bootstrap the program would run into the shared routines after its last command
+        epilogue = stack_operation.create_halt_loop() + shared_routines if args.compact_calls or args.compact_comparisons else shared_routines
     else:
-        for file in os.listdir(args.file_path):            
-            if file.endswith(".vm"):
-                print(f"AAA: {file},{file.split('.')[0]}")
-                file_name = file.split('.')[0]
-                with open(f'{args.file_path}/{file}','r') as input_fp:                    
-                    code_lines += [(file_name,line.strip()) for line in input_fp.readlines()]
-        file_output = path[1]
+        files = [
+            (file.split('.')[0], f'{args.file_path}/{file}')
+            for file in sorted(os.listdir(args.file_path)) if file.endswith(".vm")
+        ]
         path = os.path.splitext(path[-1])
         output_path = f'{args.file_path}/{path[0]}.asm'
         # generates bootstrap code, if folder is passed
-        generated_code = stack_operation.create_bootstrap_statment()
-        generated_code += stack_operation.create_call_statement(stack.Token(file="Sys.init",command='call Sys.init 0', tokens=['call', 'Sys.init', '0'], segment_pointer='Sys.init', command_type=15, variable='0'))
+        prologue = stack_operation.create_bootstrap_statment()
+        prologue += stack_operation.create_call_statement(stack.Token(file="Sys.init", segment_pointer='Sys.init', command_type=stack.CommandType.CALL, variable='0'))
+        # Sys.init never returns, so shared routines are placed right after its call
+        prologue += shared_routines
+        epilogue = []
 
-    print(code_lines)
+    generated_code = pipeline.translate(stack_operation, files, prologue, epilogue, timer, args.jobs or None, args.source_map)
 
-    tokens = []
-    for code in code_lines:        
-        tmp_token = tokenizer.Tokenizer(file=code[0],command=code[1])
-        # if some token is found, not being comment or empty spaces
-        if tmp_token.token is not None:
-            tokens.append(tmp_token)
-    
-    for token in tokens:
-        generated_operation = stack_operation.generate_operation(token.token)
-        generated_code += generated_operation
-        print(f'{token.token}\n{generated_operation}')
-    
-    #print(generated_code)
+    # peephole rules run until a fixpoint over the whole program, so the code is only materialized when optimizing
+    if args.optimize:
+        optimizer = peephole.PeepholeOptimizer(stack_pointer=str(stack_operation.SP.index))
+        generated_code = optimizer.optimize(list(generated_code))
+        print(optimizer.report())
+
+    pipeline.write_code(output_path, generated_code)
+
+    if stack_operation.CODE_CACHE is not None:
+        print(stack_operation.CODE_CACHE.report())
 
-    with open(f"{output_path}",'w') as output_fp:
-        output_fp.write('\n'.join(generated_code))
+    if timer is not None:
+        print(timer.report(time.perf_counter() - start))
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
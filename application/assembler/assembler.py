@@ -1,37 +1,39 @@
-from ast import arg
 from .binary_encoder import BinaryEncoder
+from .cache import AssemblyCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from .rom_image import create_writer
+from .source_map import SourceMapBuilder
 import argparse
+import os
 
-def main():
-    parser = argparse.ArgumentParser()
-
-    arguments_list = [
-        {'name':'file_name','type':str,'help':'specifies the file to be read'}
-    ]
-
-    for arg in arguments_list:
-        parser.add_argument(
-            arg['name'],type=arg['type'],help=arg['help']
-        )
-
-    args = parser.parse_args()
+# write buffer size for streamed .log output
+WRITE_BUFFER_SIZE = 1 << 20
 
+'''
+    Assembles file by loading every token in memory before writing .hack / .bin file
+    .map source map is written when the translator left source markers on the file
+'''
+def assemble(file_name: str, output_format: str = 'hack', header: bool = False) -> BinaryEncoder:
     encoded_tokens = []
+    source_lines = []
     binary_encoder = BinaryEncoder()
-    
-    with open(f'{args.file_name}','r') as input_fp:
+    source_map = SourceMapBuilder()
+
+    with open(f'{file_name}','r') as input_fp:
         code_lines = [line.strip() for line in input_fp.readlines()]
 
     for line in code_lines:
-        token = binary_encoder.tokenize(line)
+        token = binary_encoder.tokenize(source_map.read_line(line))
         if token.type is not None:
             encoded_tokens.append(token)
+        if token.type in [0,1]:
+            source_lines.append(binary_encoder.source_line)
+            source_map.add_instruction()
 
     binary_encoder.symbol_table.generate_variable_symbols()
 
     encoded_tokens = [token for token in binary_encoder.encode_variables(encoded_tokens) if token.type not in [-1,2]]       # second pass for variables
 
-    with open(f"{args.file_name.split('.')[0]}.log",'w') as output_fp:
+    with open(f"{os.path.splitext(file_name)[0]}.log",'w') as output_fp:
         output_fp.write(f"TOKENS\n")
         for token in encoded_tokens:
             output_fp.write(f"{token}\n")
@@ -40,11 +42,115 @@ def main():
         for key,value in binary_encoder.symbol_table.symbols.items():
             output_fp.write(f"{key} -> {value}\n")
 
-    with open(f"{args.file_name.split('.')[0]}.hack",'w') as output_fp:
-        for token in encoded_tokens:
-            output_fp.write(f"{token.binary}\n")
+    rom_writer = create_writer(os.path.splitext(file_name)[0], output_format, header)
+    for token, source_line in zip(encoded_tokens, source_lines):
+        rom_writer.write(token.binary, source_line)
+    rom_writer.close(binary_encoder.symbol_table.symbols)
+    write_source_map(file_name, source_map)
+
+    return binary_encoder
+
+'''
+    Writes <file base>.map if the assembled file had source markers, removing the one of a previous assembly otherwise
+    return:
+        bool -> source map was written
+'''
+def write_source_map(file_name: str, source_map: SourceMapBuilder) -> bool:
+    map_path = f"{os.path.splitext(file_name)[0]}.map"
+    if not source_map.origins:
+        if os.path.exists(map_path):
+            os.remove(map_path)
+        return False
+    source_map.save(map_path)
+    return True
+
+'''
+    Assembles file in two streamed passes, memory depends on the number of symbols instead of the number of instructions
+        first pass: scans the file only to build the symbol table
+        second pass: encodes each line straight to buffered .hack / .bin and .log writers
+'''
+def assemble_stream(file_name: str, output_format: str = 'hack', header: bool = False) -> BinaryEncoder:
+    binary_encoder = BinaryEncoder()
+    source_map = SourceMapBuilder()
+
+    with open(f'{file_name}','r') as input_fp:
+        for line in input_fp:
+            binary_encoder.register_symbols(line.strip())
+
+    binary_encoder.symbol_table.generate_variable_symbols()
+
+    rom_writer = create_writer(os.path.splitext(file_name)[0], output_format, header)
+
+    with open(f'{file_name}','r') as input_fp, \
+        open(f"{os.path.splitext(file_name)[0]}.log",'w',buffering=WRITE_BUFFER_SIZE) as log_fp:
+        log_fp.write(f"TOKENS\n")
+        for token in binary_encoder.encode_stream(source_map.read_line(line.strip()) for line in input_fp):
+            rom_writer.write(token.binary, binary_encoder.source_line)
+            log_fp.write(f"{token}\n")
+            source_map.add_instruction()
+
+        log_fp.write(f"VARIABLES\n")
+        for key,value in binary_encoder.symbol_table.symbols.items():
+            log_fp.write(f"{key} -> {value}\n")
+
+    rom_writer.close(binary_encoder.symbol_table.symbols)
+    write_source_map(file_name, source_map)
+
+    return binary_encoder
+
+'''
+    Assembles file through the assembly cache, skipping BinaryEncoder when the source was already assembled
+    return:
+        dict -> {'symbols': symbol table, 'instructions': number of instructions, 'cached': cache hit}
+'''
+def assemble_cached(file_name: str, output_format: str = 'hack', header: bool = False, stream: bool = False, cache: AssemblyCache = None) -> dict:
+    cache = cache or AssemblyCache()
+    output_base = os.path.splitext(file_name)[0]
+    key = cache.key(file_name, output_format, header)
+
+    metadata = cache.load(key, output_base, output_format)
+    if metadata is not None:
+        return {**metadata, 'cached': True}
+
+    assemble_file = assemble_stream if stream else assemble
+    binary_encoder = assemble_file(file_name, output_format, header)
+    metadata = {
+        'symbols':      binary_encoder.symbol_table.symbols,
+        'instructions': binary_encoder.line_number,
+        'source_map':   os.path.exists(f'{output_base}.map')
+    }
+    cache.store(key, output_base, output_format, metadata)
+
+    return {**metadata, 'cached': False}
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    arguments_list = [
+        {'name':'file_name','type':str,'help':'specifies the file to be read'},
+        {'name':'--stream','action':'store_true','help':'assembles in two streamed passes with bounded memory'},
+        {'name':'--format','choices':['hack','bin'],'default':'hack','help':'writes .hack text or packed little-endian uint16 .bin ROM image'},
+        {'name':'--header','action':'store_true','help':'adds symbol table and source line map header to .bin ROM image'},
+        {'name':'--no-cache','action':'store_true','help':'always assembles, without reading / writing the assembly cache'},
+        {'name':'--cache-dir','type':str,'default':DEFAULT_CACHE_DIR,'help':'directory of the assembly cache'},
+        {'name':'--cache-size','type':int,'default':DEFAULT_CACHE_SIZE >> 20,'help':'maximum assembly cache size in MB'},
+    ]
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    if args.no_cache:
+        assemble_file = assemble_stream if args.stream else assemble
+        symbols = assemble_file(args.file_name, args.format, args.header).symbol_table.symbols
+    else:
+        cache = AssemblyCache(args.cache_dir, args.cache_size << 20)
+        symbols = assemble_cached(args.file_name, args.format, args.header, args.stream, cache)['symbols']
 
-    print(binary_encoder.symbol_table.symbols)
+    print(symbols)
 
 if __name__=='__main__':
-    main()
\ No newline at end of file
+    main()
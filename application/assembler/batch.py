@@ -0,0 +1,86 @@
+from .assembler import assemble, assemble_stream, assemble_cached
+from .cache import AssemblyCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import time
+
+'''
+    Expands files / directories into the list of .asm files to be assembled
+'''
+def collect_files(paths: list) -> list:
+    asm_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            asm_files += [os.path.join(path,file) for file in sorted(os.listdir(path)) if file.endswith('.asm')]
+        else:
+            asm_files.append(path)
+    return asm_files
+
+'''
+    Assembles a single file on a worker process, each call creates its own BinaryEncoder and SymbolTable
+    return:
+        tuple -> (file name, number of instructions, elapsed seconds, cache hit)
+'''
+def assemble_worker(file_name: str, stream: bool = False, output_format: str = 'hack', header: bool = False, cache: AssemblyCache = None) -> tuple:
+    start = time.perf_counter()
+    if cache is not None:
+        metadata = assemble_cached(file_name, output_format, header, stream, cache)
+        return file_name, metadata['instructions'], time.perf_counter() - start, metadata['cached']
+
+    assemble_file = assemble_stream if stream else assemble
+    binary_encoder = assemble_file(file_name, output_format, header)
+    return file_name, binary_encoder.line_number, time.perf_counter() - start, False
+
+'''
+    Assembles files on a shared process pool, one file per worker
+    return:
+        list of (file name, number of instructions, elapsed seconds, cache hit), in the same order of asm_files
+'''
+def assemble_batch(asm_files: list, jobs: int = None, stream: bool = False, output_format: str = 'hack', header: bool = False, cache: AssemblyCache = None) -> list:
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(
+            executor.map(
+                assemble_worker,
+                asm_files,
+                [stream]*len(asm_files),
+                [output_format]*len(asm_files),
+                [header]*len(asm_files),
+                [cache]*len(asm_files)
+            )
+        )
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    arguments_list = [
+        {'name':'paths','nargs':'+','help':'specifies the .asm files / directories to be read'},
+        {'name':'--jobs','type':int,'default':None,'help':'number of worker processes, defaults to the number of CPUs'},
+        {'name':'--stream','action':'store_true','help':'assembles in two streamed passes with bounded memory'},
+        {'name':'--format','choices':['hack','bin'],'default':'hack','help':'writes .hack text or packed little-endian uint16 .bin ROM image'},
+        {'name':'--header','action':'store_true','help':'adds symbol table and source line map header to .bin ROM image'},
+        {'name':'--no-cache','action':'store_true','help':'always assembles, without reading / writing the assembly cache'},
+        {'name':'--cache-dir','type':str,'default':DEFAULT_CACHE_DIR,'help':'directory of the assembly cache'},
+        {'name':'--cache-size','type':int,'default':DEFAULT_CACHE_SIZE >> 20,'help':'maximum assembly cache size in MB'},
+    ]
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cache = None if args.no_cache else AssemblyCache(args.cache_dir, args.cache_size << 20)
+    results = assemble_batch(collect_files(args.paths), args.jobs, args.stream, args.format, args.header, cache)
+    elapsed = time.perf_counter() - start
+
+    for file_name, instructions, file_elapsed, cached in results:
+        print(f"{file_name}: {instructions} instructions in {file_elapsed:.3f}s{' (cached)' if cached else ''}")
+
+    total_instructions = sum(result[1] for result in results)
+    print(f'Assembled {len(results)} files, {total_instructions} instructions in {elapsed:.3f}s ({total_instructions/elapsed if elapsed else 0:.0f} instructions/s)')
+
+if __name__=='__main__':
+    main()
@@ -1,9 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from itertools import product
 from typing import List
 import re
 from .symbol_table import SymbolTable
 
-@dataclass
+# bumped whenever encoded output changes, invalidates assembly cache entries
+ENCODER_VERSION = 2
+
+@dataclass(frozen=True, slots=True)
 class Token:
     type:       int                                                                                             # A-instruction or C-instruction
     binary:     str                                                                                             # Encoded binary value
@@ -11,204 +15,221 @@ class Token:
     variable:   str                                                                                             # variable name
     line:       int                                                                                             # Line number
 
+'''
+    Lookup tables for the Hack instruction set, built once at import time
+        0: A-Instruction
+        1: C-Instruction
+        2: L-Instruction -> Label instruction, defined by (<VAR_NAME>)
+'''
+INSTRUCTION_SET = {
+    '@': 0,
+    '(': 2
+}
+
+DEST_CODES = {
+    'M':    '001',
+    'D':    '010',
+    'MD':   '011',
+    'A':    '100',
+    'AM':   '101',
+    'AD':   '110',
+    'AMD':  '111'
+}
+
+JMP_CODES = {
+    'JGT':   '001',
+    'JEQ':   '010',
+    'JGE':   '011',
+    'JLT':   '100',
+    'JNE':   '101',
+    'JLE':   '110',
+    'JMP':   '111'
+}
+
+COMP_CODES = {
+    '0':    '0101010',
+    '1':    '0111111',
+    '-1':   '0111010',
+    'D':    '0001100',
+    'A':    '0110000',
+    'M':    '1110000',
+    '!D':   '0001101',
+    '!A':   '0110011',
+    '!M':   '1110001',
+    '-D':   '0001111',
+    '-A':   '0110011',
+    '-M':   '1110011',
+    'D+1':  '0011111',
+    'A+1':  '0110111',
+    'M+1':  '1110111',
+    'D-1':  '0001110',
+    'A-1':  '0110010',
+    'M-1':  '1110010',
+    'D+A':  '0000010',
+    'D+M':  '1000010',
+    'D-A':  '0010011',
+    'D-M':  '1010011',
+    'A-D':  '0000111',
+    'M-D':  '1000111',
+    'D&A':  '0000000',
+    'D&M':  '1000000',
+    'D|A':  '0010101',
+    'D|M':  '1010101',
+    # commutative spellings emitted by the VM translator (ex: M=M+D on add)
+    'A+D':  '0000010',
+    'M+D':  '1000010',
+    'A&D':  '0000000',
+    'M&D':  '1000000',
+    'A|D':  '0010101',
+    'M|D':  '1010101',
+}
+
+'''
+    Every dest=comp;jump combination mapped to its 16-bit word, so a C-Instruction is encoded with a single dict lookup
+    111 a c1 c2 c3 c4 c5 c6 d1 d2 d3 j1 j2 j3
+'''
+C_INSTRUCTION_CODES = {
+    f"{dest+'=' if dest else ''}{comp}{';'+jmp if jmp else ''}": f"111{comp_code}{DEST_CODES.get(dest,'000')}{JMP_CODES.get(jmp,'000')}"
+    for (comp, comp_code), dest, jmp in product(COMP_CODES.items(), ['',*DEST_CODES], ['',*JMP_CODES])
+}
+
+# fallback for C-Instructions not spelled as dest=comp;jump, ex: "0;;JMP"
+C_INSTRUCTION_REGEX = re.compile(r'(([AMD]*)=+)?([01AMD\+\-&|!]+);*(.*)?')
+
+'''
+    Cleans code, by removing comments and spaces
+    param: 
+        code: str
+    return:
+        str -> cleaned string
+'''
+def clean_line(code: str) -> str:
+    comment_position = code.find('//')                                                                      # comment starts at the first "//" of the line
+    if comment_position >= 0:
+        code = code[:comment_position]
+    return ''.join(code.split())                                                                            # removes spaces from code
+
 @dataclass
 class BinaryEncoder:
     tokens:                 List[Token] = None
-    symbol_table:           SymbolTable = SymbolTable()    
+    symbol_table:           SymbolTable = field(default_factory=SymbolTable)                            # one table per encoder, so files never share symbols
     line_number:            int = 0
+    source_line:            int = 0                                                                         # line number on source file of last tokenized code
     code:                   str = None
     
 
-    '''
-        Removes all spaces of given code line
-        param: 
-            code: str
-        return:
-            str -> string without spaces
-    '''
-    def remove_spaces(self):
-        self.code = re.sub(r'\s+','',self.code)
-    
-    '''
-        Cleans code, by removing spaces and comments
-        param: 
-            code: str
-        return:
-            str -> cleaned string
-    '''
-    def clean_code(self):
-        regex_return = re.findall(r'(.*)(?=\/\/)',self.code)                                                    # tries to remove comments
-        self.code = regex_return[0] if len(regex_return) > 0 else self.code                                     # if no comment is found, regex will return null list and code must be trimed
-        self.remove_spaces()                                                                                    # removes spaces from code
-
-    '''
-        Cleans out code and checks if its a command
-        param: 
-            code: str
-        return:
-            int
-                False: command line is either a comment or empty line
-                True: command line is C or A instruction                
-    '''
-    def is_command(self):
-        self.clean_code()                                                                                       # cleans up code
-        return True if len(self.code) else False                                                                # returns True if cleaned string has length > 0
-
-    '''
-        Returns instruction set for self.code after cleaned
-        param: 
-            code: str
-        return:
-            int
-                0: A-Instruction
-                1: C-Instruction
-                2: L-Instruction -> Label instruction, defined by (<VAR_NAME>)
-    '''
-    def define_instruction_set(self):
-        instruction_set = {
-            '@': 0,
-            '(': 2
-        }
-        if self.is_command():                                                                                   # checks if it's a command
-            return instruction_set[self.code[0]] if self.code[0] in instruction_set.keys() else 1               # returns type based on instruction_set or 1 since its a C-Instruction
-        else:
-            return -1                                                                                           # returns -1 when empty / comment lines
-
     '''
         C-Instruction is comprised of:
         dest = comp ; jump
         111 a c1 c2 c3 c4 c5 c6 d1 d2 d3 j1 j2 j3
     '''
     def parse_c_instruction(self):
-        c_instruction_part  = '111'
-        destination_part    = '000'
-        jump_part           = '000'
-
-        dest_codes = {
-            'M':    '001',
-            'D':    '010',
-            'MD':   '011',
-            'A':    '100',
-            'AM':   '101',
-            'AD':   '110',
-            'AMD':  '111'
-        }
-
-        jmp_codes = {
-            'JGT':   '001',
-            'JEQ':   '010',
-            'JGE':   '011',
-            'JLT':   '100',
-            'JNE':   '101',
-            'JLE':   '110',
-            'JMP':   '111'
-        }
-
-        comp_codes = {
-            '0':    '0101010',
-            '1':    '0111111',
-            '-1':   '0111010',
-            'D':    '0001100',
-            'A':    '0110000',
-            'M':    '1110000',
-            '!D':   '0001101',
-            '!A':   '0110011',
-            '!M':   '1110001',
-            'D+1':  '0011111',
-            'A+1':  '0110111',
-            'M+1':  '1110111',
-            'D-1':  '0001110',
-            'A-1':  '0110010',
-            'M-1':  '1110010',
-            'D+A':  '0000010',
-            'D+M':  '1000010',
-            'D-A':  '0010011',
-            'D-M':  '1010011',
-            'A-D':  '0000111',
-            'M-D':  '1000111',
-            'D&A':  '0000000',
-            'D&M':  '1000000',
-            'D|A':  '0010101',
-            'D|M':  '1010101',
-        }
+        binary = C_INSTRUCTION_CODES.get(self.code)                                                            # single lookup for dest=comp;jump spelling
+        if binary is not None:
+            return binary
 
         # splits string into command parts
-        split_parts = re.findall(r'(([AMD]*)=+)?([01AMD\+\-&|!]+);*(.*)?',self.code)[0]
-        
-        generate_dest = False
-        generate_jmp = False
-
-        if split_parts[1] != '':
-            generate_dest = True
-        if split_parts[3] != '':
-            generate_jmp = True
-        
-        return f"{c_instruction_part}{comp_codes[split_parts[2]]}{dest_codes[split_parts[1]] if generate_dest else destination_part}{jmp_codes[split_parts[3]] if generate_jmp else jump_part}"
+        split_parts = C_INSTRUCTION_REGEX.findall(self.code)[0]
+
+        return f"111{COMP_CODES[split_parts[2]]}{DEST_CODES[split_parts[1]] if split_parts[1] != '' else '000'}{JMP_CODES[split_parts[3]] if split_parts[3] != '' else '000'}"
 
     '''
-        Returns the encoded instruction to binary
+        Returns the encoded A-Instruction to binary, adding labels / variables to symbol table
         return:
             string
-                binary-encoded string
+                binary-encoded string or None if it's a label / variable
     '''
-    def encode_instruction(self):
-        if self.is_command():
-            instruction_set = self.define_instruction_set()
-
-            if instruction_set == 0:                                                                            # A-instruction                
-                temp_code = self.code[1:]                                                                       # removes ";" from code line
-                try:
-                    return "{0:016b}".format(int(temp_code))                                                    # checks if it's a value
-                except ValueError:                                                                              # parsed value is a label
-                    if not self.symbol_table.entry_is_present(temp_code):                                       # if value is already in symbols_table
-                        self.symbol_table.add_entry('label',temp_code,-1)                                       # adds variable to symbols table
-    
-
-            if instruction_set == 1:                                                                            # C-Instruction
-                return self.parse_c_instruction()
-
-            if instruction_set == 2:                                                                            # L-Instruction                
-                temp_code = re.findall(r'\((.*)\)',self.code)[0]
-                if self.symbol_table.entry_is_present(temp_code):                       
-                    self.symbol_table.update_symbol(temp_code,self.line_number)
-                else:
-                    self.symbol_table.add_entry('label', temp_code, self.line_number)                           # adds variable to symbols table
+    def encode_a_instruction(self, variable: str):
+        try:
+            return "{0:016b}".format(int(variable))                                                             # checks if it's a value
+        except ValueError:                                                                                      # parsed value is a label
+            if not self.symbol_table.entry_is_present(variable):                                               # if value is already in symbols_table
+                self.symbol_table.add_entry('label',variable,-1)                                               # adds variable to symbols table
 
     '''
-        Return variable / label name
+        Registers L-Instruction label on the symbol table with current line number
     '''
-    def get_variable_label_name(self):
-        if self.define_instruction_set() != 1:
-            self.clean_code()                                                                                   # cleans code
-            lookup_name = re.findall(r'@(.*)|\((.*)\)',self.code)
-            return (
-                (lookup_name[0][0] if lookup_name[0][0] != '' else lookup_name[0][1]) 
-                    if len(lookup_name) > 0 else None                                                           # gets alpha-numeric value from either @1, @i or (LOOP) type of statments 
-            )
+    def encode_l_instruction(self, variable: str):
+        if self.symbol_table.entry_is_present(variable):
+            self.symbol_table.update_symbol(variable,self.line_number)
+        else:
+            self.symbol_table.add_entry('label', variable, self.line_number)                                   # adds variable to symbols table
 
     '''
         Encodes variabels to values after the passed encoding returns null, 
         by searching the symbol table and encoding the variable dict value
     '''
     def encode_variables(self, tokens):
-        for token in tokens:
-            if token.type >= 0 and token.binary is None:                                                        # A-instruction with label / variable name               
-                token.binary = "{0:016b}".format(int(self.symbol_table.symbols[token.variable]))
+        return [
+            replace(token, binary="{0:016b}".format(int(self.symbol_table.symbols[token.variable])))
+            if token.type >= 0 and token.binary is None else token                                              # A-instruction with label / variable name
+            for token in tokens
+        ]
+
+    '''
+        First pass of streaming assembly, registers labels / variables on the symbol table without keeping tokens
+    '''
+    def register_symbols(self, code):
+        self.code = clean_line(code)
+        if self.code:
+            instruction_set = INSTRUCTION_SET.get(self.code[0],1)
+            if instruction_set == 0:                                                                            # A-instruction
+                self.encode_a_instruction(self.code[1:])
+            if instruction_set == 2:                                                                            # L-Instruction
+                self.encode_l_instruction(self.code[1:self.code.rindex(')')])
+            if instruction_set in (0,1):
+                self.line_number += 1
+
+    '''
+        Second pass of streaming assembly, yields encoded A / C instructions one at a time
+        param:
+            code_lines: iterable of code lines, symbol table must be filled by register_symbols beforehand
+    '''
+    def encode_stream(self, code_lines):
+        self.line_number = 0
+        self.source_line = 0
+        for line in code_lines:
+            token = self.tokenize(line)
+            if token.type in (0,1):
+                if token.binary is None:                                                                        # A-instruction with label / variable name
+                    token = replace(token, binary="{0:016b}".format(int(self.symbol_table.symbols[token.variable])))
+                yield token
+
+    '''
+        Classifies and encodes code line in a single pass
+        return:
+            Token
+                type -1: empty / comment line
+                type  0: A-Instruction
+                type  1: C-Instruction
+                type  2: L-Instruction
+    '''
+    def tokenize(self,code):
+        self.code = clean_line(code)                                                                            # sets internal class code to cleaned string
+        self.source_line += 1
+        binary = variable = None
 
-        return tokens                
+        if not self.code:
+            instruction_set = -1                                                                                # returns -1 when empty / comment lines
+        else:
+            instruction_set = INSTRUCTION_SET.get(self.code[0],1)                                              # returns type based on instruction_set or 1 since its a C-Instruction
+            if instruction_set == 0:                                                                            # A-instruction
+                variable = self.code[1:]                                                                        # removes "@" from code line
+                binary = self.encode_a_instruction(variable)
+            elif instruction_set == 1:                                                                          # C-Instruction
+                binary = self.parse_c_instruction()
+            else:                                                                                               # L-Instruction
+                variable = self.code[1:self.code.rindex(')')]                                                   # removes "(" and ")" from code line
+                self.encode_l_instruction(variable)
 
-    def tokenize(self,code):
-        self.code = code                                                                                        # sets internal class code to passed string        
-        self.clean_code()                                                                                       # cleans out code
-        
         tmp_token = Token(
-            self.define_instruction_set(),
-            self.encode_instruction(),
+            instruction_set,
+            binary,
             self.code,
-            self.get_variable_label_name(),
+            variable,
             self.line_number
         )
 
-        print(tmp_token)
-        self.line_number += 1 if self.define_instruction_set() in [0,1] else 0                                  # gets line number for code, ignores empty lines or comments
-        return tmp_token
\ No newline at end of file
+        if instruction_set in (0,1):
+            self.line_number += 1                                                                               # gets line number for code, ignores empty lines or comments
+        return tmp_token
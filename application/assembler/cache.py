@@ -0,0 +1,104 @@
+from .binary_encoder import ENCODER_VERSION
+from .rom_image import ROM_VERSION
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR   = os.path.join(os.path.expanduser('~'),'.cache','nand2tetris','assembler')
+DEFAULT_CACHE_SIZE  = 256 << 20                                 # bytes
+
+# block size used when hashing source files
+HASH_BLOCK_SIZE     = 1 << 20
+
+'''
+    On-disk cache of assembled outputs, keyed by the hash of source file and encoder version
+    each entry is a directory containing:
+        rom: .hack / .bin output
+        log: .log output
+        map: .map source map, if the source had source markers
+        metadata.json: symbol table, number of instructions and source map presence
+    entries are evicted by least recently used order, based on the entry directory mtime, once max_size is exceeded
+'''
+@dataclass
+class AssemblyCache:
+    cache_dir:  str = DEFAULT_CACHE_DIR
+    max_size:   int = DEFAULT_CACHE_SIZE
+
+    def key(self, file_name: str, output_format: str = 'hack', header: bool = False) -> str:
+        digest = hashlib.sha256(f'{ENCODER_VERSION}:{ROM_VERSION}:{output_format}:{header}\n'.encode('utf-8'))
+        with open(file_name,'rb') as input_fp:
+            for block in iter(lambda: input_fp.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    '''
+        Copies cached outputs to <output_base>.<output_format> / <output_base>.log / <output_base>.map
+        return:
+            dict -> metadata of cached entry, None if not cached
+    '''
+    def load(self, key: str, output_base: str, output_format: str = 'hack'):
+        entry = os.path.join(self.cache_dir,key)
+        try:
+            with open(os.path.join(entry,'metadata.json'),'r') as input_fp:
+                metadata = json.load(input_fp)
+            shutil.copyfile(os.path.join(entry,'rom'),f'{output_base}.{output_format}')
+            shutil.copyfile(os.path.join(entry,'log'),f'{output_base}.log')
+            if metadata.get('source_map'):
+                shutil.copyfile(os.path.join(entry,'map'),f'{output_base}.map')
+            elif os.path.exists(f'{output_base}.map'):
+                os.remove(f'{output_base}.map')
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        os.utime(entry)                                                                 # marks entry as recently used
+        return metadata
+
+    '''
+        Stores outputs written to <output_base>.<output_format> / <output_base>.log / <output_base>.map and evicts old entries
+    '''
+    def store(self, key: str, output_base: str, output_format: str, metadata: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = os.path.join(self.cache_dir,key)
+        tmp_entry = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp-')
+
+        shutil.copyfile(f'{output_base}.{output_format}',os.path.join(tmp_entry,'rom'))
+        shutil.copyfile(f'{output_base}.log',os.path.join(tmp_entry,'log'))
+        if metadata.get('source_map'):
+            shutil.copyfile(f'{output_base}.map',os.path.join(tmp_entry,'map'))
+        with open(os.path.join(tmp_entry,'metadata.json'),'w') as output_fp:
+            json.dump(metadata, output_fp)
+
+        # renaming makes entry visible atomically to other processes
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:                                                                 # entry stored by another process
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict()
+
+    def entry_size(self, entry: str) -> int:
+        return sum(os.path.getsize(os.path.join(entry,file)) for file in os.listdir(entry))
+
+    '''
+        Removes least recently used entries until cache size is under max_size
+    '''
+    def evict(self):
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir,key)
+            if key.startswith('.tmp-'):
+                continue
+            try:
+                entries.append((os.path.getmtime(entry), self.entry_size(entry), entry))
+            except FileNotFoundError:                                                   # evicted by another process
+                continue
+
+        total_size = sum(entry[1] for entry in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,174 @@
+from array import array
+from dataclasses import dataclass, field
+import json
+import mmap
+import struct
+import sys
+
+'''
+    Packed ROM image layout (little-endian):
+        without header: uint16 words only, one per instruction
+        with header:
+            magic           8s  b'HACKROM\0'
+            version         H
+            flags           H   1: symbol table present, 2: source line map present
+            word_count      I
+            code_offset     I   offset of the uint16 words
+            symbols_offset  I   offset of the symbol table, as utf-8 JSON object
+            symbols_length  I
+            lines_offset    I   offset of the source line map, one uint32 .asm line number per word
+            lines_length    I
+'''
+ROM_MAGIC           = b'HACKROM\0'
+ROM_VERSION         = 1
+ROM_HEADER          = struct.Struct('<8sHHIIIIII')
+ROM_FLAG_SYMBOLS    = 1
+ROM_FLAG_LINES      = 2
+
+# number of words packed before flushing to file
+WRITE_CHUNK_SIZE    = 1 << 16
+
+@dataclass
+class InvalidRomImage(Exception):
+    data: str
+
+@dataclass
+class RomImage:
+    words:      array                                           # uint16 instruction words
+    symbols:    dict = None                                     # symbol table, if header was written
+    lines:      array = None                                    # .asm source line for each word, if header was written
+
+'''
+    Writes encoded instructions as .hack text, one line of '0'/'1' per instruction
+'''
+@dataclass
+class HackWriter:
+    file_path:      str
+    buffering:      int = 1 << 20
+
+    def __post_init__(self):
+        self.output_fp = open(self.file_path,'w',buffering=self.buffering)
+
+    def write(self, binary: str, source_line: int = None):
+        self.output_fp.write(f"{binary}\n")
+
+    def close(self, symbols: dict = None):
+        self.output_fp.close()
+
+'''
+    Writes encoded instructions as packed little-endian uint16 words, with optional header
+    holding the symbol table and the source line map
+'''
+@dataclass
+class RomImageWriter:
+    file_path:      str
+    header:         bool = False
+    word_count:     int = 0
+    words:          array = field(default_factory=lambda: array('H'))
+    lines:          array = field(default_factory=lambda: array('I'))
+
+    def __post_init__(self):
+        self.output_fp = open(self.file_path,'wb')
+        if self.header:
+            self.output_fp.write(bytes(ROM_HEADER.size))                                # placeholder, patched on close
+
+    def flush_words(self):
+        if sys.byteorder == 'big':
+            self.words.byteswap()
+        self.words.tofile(self.output_fp)
+        self.words = array('H')
+
+    def write(self, binary: str, source_line: int = None):
+        self.words.append(int(binary,2))
+        self.word_count += 1
+        if self.header:
+            self.lines.append(source_line or 0)
+        if len(self.words) >= WRITE_CHUNK_SIZE:
+            self.flush_words()
+
+    def close(self, symbols: dict = None):
+        self.flush_words()
+        if self.header:
+            symbols_offset = self.output_fp.tell()
+            symbols_content = json.dumps(symbols or {}).encode('utf-8')
+            self.output_fp.write(symbols_content)
+            # keeps line map aligned to 4 bytes
+            self.output_fp.write(bytes(-self.output_fp.tell() % 4))
+            lines_offset = self.output_fp.tell()
+            if sys.byteorder == 'big':
+                self.lines.byteswap()
+            self.lines.tofile(self.output_fp)
+            self.output_fp.seek(0)
+            self.output_fp.write(
+                ROM_HEADER.pack(
+                    ROM_MAGIC,
+                    ROM_VERSION,
+                    (ROM_FLAG_SYMBOLS if symbols is not None else 0) | ROM_FLAG_LINES,
+                    self.word_count,
+                    ROM_HEADER.size,
+                    symbols_offset,
+                    len(symbols_content),
+                    lines_offset,
+                    len(self.lines) * self.lines.itemsize
+                )
+            )
+        self.output_fp.close()
+
+'''
+    Creates writer for the chosen output format
+        hack: text .hack file
+        bin: packed .bin ROM image
+'''
+def create_writer(file_base: str, output_format: str = 'hack', header: bool = False):
+    if output_format == 'bin':
+        return RomImageWriter(f'{file_base}.bin', header=header)
+    return HackWriter(f'{file_base}.hack')
+
+'''
+    Reads packed ROM image through mmap, words are a view over the mapped file on little-endian hosts
+'''
+def read_rom_image(file_path: str) -> RomImage:
+    with open(file_path,'rb') as input_fp:
+        if input_fp.seek(0,2) == 0:
+            return RomImage(array('H'))
+        content = mmap.mmap(input_fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(content)
+    if content[:len(ROM_MAGIC)] != ROM_MAGIC:
+        if len(content) % 2:
+            raise InvalidRomImage(f'ROM image {file_path} has odd size {len(content)}, expected uint16 words')
+        return RomImage(native_words(view))
+
+    magic, version, flags, word_count, code_offset, symbols_offset, symbols_length, lines_offset, lines_length = ROM_HEADER.unpack_from(content)
+    if version != ROM_VERSION:
+        raise InvalidRomImage(f'ROM image {file_path} has version {version}, expected {ROM_VERSION}')
+
+    symbols = json.loads(bytes(view[symbols_offset:symbols_offset+symbols_length])) if flags & ROM_FLAG_SYMBOLS else None
+    lines = None
+    if flags & ROM_FLAG_LINES:
+        lines = array('I')
+        lines.frombytes(view[lines_offset:lines_offset+lines_length])
+        if sys.byteorder == 'big':
+            lines.byteswap()
+
+    return RomImage(native_words(view[code_offset:code_offset+word_count*2]), symbols, lines)
+
+'''
+    Returns uint16 words from little-endian buffer, without copying on little-endian hosts
+'''
+def native_words(view: memoryview):
+    if sys.byteorder == 'little':
+        return view.cast('H')
+    words = array('H')
+    words.frombytes(view)
+    words.byteswap()
+    return words
+
+'''
+    Loads instruction words from .hack text or packed .bin ROM image
+'''
+def load_rom(file_path: str):
+    if file_path.endswith('.hack'):
+        with open(file_path,'r') as input_fp:
+            return RomImage(array('H', (int(line,2) for line in map(str.strip,input_fp) if line)))
+    return read_rom_image(file_path)
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+import json
+
+'''
+    Source markers are comment lines written by the translator before the code of each VM command:
+        //# <file>:<line> <function> <command>
+    a bare "//#" marks shared code (call / return / comparison routines), whose cycles belong to the command that jumped to it
+    the assembler ignores them as comments, and turns them into a ROM address -> VM command map
+'''
+SOURCE_MARKER       = '//#'
+SOURCE_MAP_VERSION  = 1
+# origin index of ROM words without VM command (shared routines, bootstrap)
+NO_ORIGIN           = -1
+
+@dataclass(frozen=True, slots=True)
+class SourceOrigin:
+    file:       str
+    line:       int
+    function:   str                                             # "-" outside functions
+    command:    str                                             # VM command type, as written on .vm files
+
+    def __str__(self):
+        return f'{self.file}:{self.line}'
+
+def create_source_marker(origin: SourceOrigin = None) -> str:
+    if origin is None:
+        return SOURCE_MARKER
+    return f'{SOURCE_MARKER} {origin.file}:{origin.line} {origin.function} {origin.command}'
+
+'''
+    Parses marker line
+    return:
+        SourceOrigin -> None for shared code markers
+'''
+def parse_source_marker(line: str) -> SourceOrigin:
+    fields = line[len(SOURCE_MARKER):].split()
+    if not fields:
+        return None
+    file, _, source_line = fields[0].rpartition(':')
+    return SourceOrigin(file, int(source_line), fields[1], fields[2])
+
+'''
+    Builds the source map while assembling, read_line must see every line and add_instruction every encoded instruction, in order
+'''
+@dataclass
+class SourceMapBuilder:
+    origins:        list = field(default_factory=list)          # SourceOrigin, referenced by index
+    origin_indexes: dict = field(default_factory=dict)          # SourceOrigin -> index
+    runs:           list = field(default_factory=list)          # [first ROM address, origin index], one per run of words with the same origin
+    functions:      dict = field(default_factory=dict)          # function name -> entry ROM address
+    current:        int = NO_ORIGIN
+    address:        int = 0
+
+    def read_line(self, line: str) -> str:
+        if line.startswith(SOURCE_MARKER):
+            origin = parse_source_marker(line)
+            if origin is None:
+                self.current = NO_ORIGIN
+            else:
+                self.current = self.origin_indexes.setdefault(origin, len(self.origins))
+                if self.current == len(self.origins):
+                    self.origins.append(origin)
+                if origin.command == 'function':
+                    self.functions[origin.function] = self.address
+        return line
+
+    def add_instruction(self):
+        if not self.runs or self.runs[-1][1] != self.current:
+            self.runs.append([self.address, self.current])
+        self.address += 1
+
+    def save(self, file_path: str):
+        with open(file_path,'w') as output_fp:
+            json.dump({
+                'version':      SOURCE_MAP_VERSION,
+                'words':        self.address,
+                'origins':      [[origin.file, origin.line, origin.function, origin.command] for origin in self.origins],
+                'runs':         self.runs,
+                'functions':    self.functions,
+            }, output_fp)
+
+@dataclass
+class SourceMap:
+    origins:    list                                            # SourceOrigin
+    addresses:  list                                            # origin index per ROM address, NO_ORIGIN for shared code
+    functions:  dict                                            # function name -> entry ROM address
+
+def load_source_map(file_path: str) -> SourceMap:
+    with open(file_path,'r') as input_fp:
+        content = json.load(input_fp)
+
+    addresses = [NO_ORIGIN] * content['words']
+    runs = content['runs'] + [[content['words'], NO_ORIGIN]]
+    for (start, origin), (end, _) in zip(runs, runs[1:]):
+        addresses[start:end] = [origin] * (end - start)
+
+    return SourceMap(
+        [SourceOrigin(*origin) for origin in content['origins']],
+        addresses,
+        content['functions']
+    )
@@ -0,0 +1,98 @@
+from dataclasses import dataclass, field
+import xml.etree.ElementTree as ET
+import hashlib
+import json
+import os
+
+# file written to the compiled directory
+BUILD_CACHE_FILE    = 'build_cache.json'
+# bumped when the compiler output changes, discarding every cached class
+BUILD_CACHE_VERSION = 1
+
+'''
+    Incremental build cache of a Jack project, stored as a JSON file next to the ".jack" files
+    each class, keyed by file name, keeps:
+        hash: sha256 of its ".jack" source
+        signatures: subroutine name -> [kind, return type, parameter types], every Jack subroutine being public
+        dependencies: project class referenced by the class -> signature digest of that class when it was compiled
+        vm_commands: VM code written by CodeWriter
+    a class is reused when its source hash matches and every dependency still has the same signature digest
+'''
+@dataclass
+class BuildCache:
+    cache_path: str
+    classes:    dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path,'r') as input_fp:
+                content = json.load(input_fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if content.get('version') == BUILD_CACHE_VERSION:
+            self.classes = content['classes']
+
+    '''
+        Saves entries of class_names, dropping classes removed from the project
+    '''
+    def save(self, class_names: set):
+        with open(self.cache_path,'w') as output_fp:
+            json.dump({
+                'version':  BUILD_CACHE_VERSION,
+                'classes':  {class_name: entry for class_name, entry in self.classes.items() if class_name in class_names},
+            }, output_fp)
+
+    '''
+        return:
+            dict -> cached entry of class, None if missing or compiled from another source
+    '''
+    def get(self, class_name: str, source_hash: str) -> dict:
+        entry = self.classes.get(class_name)
+        if entry is None or entry['hash'] != source_hash:
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict, signature_digests: dict) -> bool:
+        return all(signature_digests.get(class_name) == digest for class_name, digest in entry['dependencies'].items())
+
+    def store(self, class_name: str, source_hash: str, signatures: dict, dependencies: dict, vm_commands: list):
+        self.classes[class_name] = {
+            'hash':         source_hash,
+            'signatures':   signatures,
+            'dependencies': dependencies,
+            'vm_commands':  vm_commands,
+        }
+
+def hash_source(file_path: str) -> str:
+    with open(file_path,'rb') as input_fp:
+        return hashlib.sha256(input_fp.read()).hexdigest()
+
+'''
+    Reads subroutine signatures from the syntax tree of CompilationEngine
+    return:
+        dict -> subroutine name -> [kind, return type, parameter types]
+'''
+def subroutine_signatures(syntax_tree: ET) -> dict:
+    signatures = {}
+    for subroutine_declaration in syntax_tree.iterfind('subroutineDec'):
+        kind, return_type = [tag.text for tag in subroutine_declaration if tag.tag in ['keyword','identifier']][:2]
+        subroutine_name = subroutine_declaration.find('subroutineName/identifier').text
+        # parameter list alternates types and names, separated by ',' symbols
+        parameters = [tag.text for tag in subroutine_declaration.find('parameterList') if tag.tag != 'symbol']
+        signatures[subroutine_name] = [kind, return_type, parameters[::2]]
+    return signatures
+
+def signature_digest(signatures: dict) -> str:
+    return hashlib.sha256(json.dumps(signatures, sort_keys=True).encode('utf-8')).hexdigest()
+
+def class_identifiers(syntax_tree: ET) -> set:
+    return {tag.text for tag in syntax_tree.iter('identifier')}
+
+'''
+    Project classes named anywhere in the class identifiers, as variable types or subroutine call targets
+'''
+def referenced_classes(identifiers: set, class_name: str, class_names: set) -> set:
+    return identifiers & class_names - {class_name}
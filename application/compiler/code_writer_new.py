@@ -1,5 +1,9 @@
 # built-in
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import io
+import traceback
 from dataclasses import dataclass, field
 import argparse, os
 from typing import Dict
@@ -9,6 +13,7 @@ import sys
 # symbol table custom code
 from symbol_table import SymbolTable, VariableNotFound
 from compilation_engine_without_tags import CompilationEngine, flatten_list
+from build_cache import BuildCache, BUILD_CACHE_FILE, hash_source, subroutine_signatures, signature_digest, class_identifiers, referenced_classes
 
 @dataclass
 class VMCommand():
@@ -275,15 +280,14 @@ class CodeWriter():
         return expression_vm_commands
 
     '''
-        compiles file, to output tokens and syntax
+        compiles file / directory, reusing unchanged classes of the build cache when given
+        returns VM commands of each ".jack" file, in file name order
     '''
-    def compile_files(self, file_path: str):
+    def compile_files(self, file_path: str, write_tokens: bool = False, cache: BuildCache = None, jobs: int = 1) -> list:
         if os.path.isfile(f'{os.path.join(os.getcwd(),file_path)}'):
-            CompilationEngine(file_path)        
+            return compile_project([file_path],write_tokens,cache,jobs)
         else:
-            for file in os.listdir(file_path):
-                if file.endswith(".jack"):
-                    CompilationEngine(os.path.join(file_path,file))
+            return compile_project([os.path.join(file_path,file) for file in sorted(os.listdir(file_path)) if file.endswith(".jack")],write_tokens,cache,jobs)
 
     '''
         code for creating class symbol table from XML structure
@@ -460,6 +464,164 @@ class CodeWriter():
         
         return procedural_commands
     
+'''
+    parses ".jack" file through CompilationEngine, writing its syntax tree to "< file_name >Syntax.xml"
+'''
+def parse_class(file: str, write_tokens: bool = False) -> ET:
+    CompilationEngine(file,write_tokens=write_tokens)
+    file_path, file_full_name = os.path.split(file)
+    file_name, file_extension = file_full_name.split('.')
+    return ET.parse(f"{os.path.join(os.getcwd(),file_path,file_name+'Syntax.xml')}")
+
+'''
+    writes VM commands of a parsed class
+'''
+def write_class(xml_tree: ET) -> list:
+    # update class variable table, by using "classVarDec" and "classVarDecList" tag
+    class_name = [tag.text for tag in xml_tree.find('className')][0]
+
+    cw = CodeWriter(class_name)
+
+    cw.create_class_symbol_table(xml_tree)
+
+    vm_commands = []
+    # checks for subroutines
+    for subroutine_declaration in xml_tree.iterfind('subroutineDec'):
+        subroutine_specs = cw.create_subroutine_symbol_table(subroutine_declaration)
+        vm_commands += cw.write_vm_commands(subroutine_specs,subroutine_declaration)
+
+    return vm_commands
+
+@dataclass
+class CompilationErrors(Exception):
+    data: str
+
+'''
+    keeps log records of a worker process, to be logged again by the main process
+'''
+class LogRecordCollector(logging.Handler):
+    def __init__(self, level: int):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append((record.levelno, record.getMessage()))
+
+'''
+    compiles a single class on a worker process, each call creates its own CompilationEngine, CodeWriter and symbol tables
+    printed output and log records are kept, so they aren't interleaved with other workers
+    return:
+        tuple -> (compiled class, printed output, log records, error traceback or None)
+            compiled class being (subroutine signatures, identifiers, VM commands), None on error
+'''
+def compile_worker(file: str, write_tokens: bool = False, log_level: int = logging.WARNING) -> tuple:
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers, root_logger.level
+    collector = LogRecordCollector(log_level)
+    root_logger.handlers, root_logger.level = [collector], log_level
+
+    output = io.StringIO()
+    compiled_class, error = None, None
+    try:
+        with redirect_stdout(output):
+            xml_tree = parse_class(file,write_tokens)
+            compiled_class = (subroutine_signatures(xml_tree), class_identifiers(xml_tree), write_class(xml_tree))
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        root_logger.handlers, root_logger.level = handlers, level
+
+    return compiled_class, output.getvalue(), collector.records, error
+
+'''
+    compiles classes, either parsing every class before writing VM commands on the current process,
+    or one class per worker process when jobs isn't 1, reporting printed output, log records and errors in files order
+    return:
+        dict -> file -> (subroutine signatures, identifiers, VM commands)
+'''
+def compile_classes(files: list, write_tokens: bool = False, jobs: int = 1) -> dict:
+    if jobs == 1:
+        xml_trees = {file: parse_class(file,write_tokens) for file in files}
+        return {file: (subroutine_signatures(xml_tree), class_identifiers(xml_tree), write_class(xml_tree)) for file, xml_tree in xml_trees.items()}
+
+    compiled_classes = {}
+    errors = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for file, (compiled_class, output, log_records, error) in zip(files, executor.map(
+            compile_worker,
+            files,
+            [write_tokens]*len(files),
+            [logging.getLogger().getEffectiveLevel()]*len(files)
+        )):
+            print(output, end='')
+            for level, message in log_records:
+                logging.log(level, message)
+            if error is not None:
+                errors.append(f'{file}:\n{error.rstrip()}')
+            else:
+                compiled_classes[file] = compiled_class
+
+    if errors:
+        raise CompilationErrors('\n'.join(errors))
+    return compiled_classes
+
+'''
+    compiles ".jack" files of a project, see compile_classes
+    without cache every file is compiled
+    with cache, classes whose source changed are compiled first, then unchanged classes referencing a class whose signatures changed
+    other classes reuse their cached VM commands, skipping tokenizing, parsing and code writing
+    return:
+        list -> VM commands of each file, in files order
+'''
+def compile_project(files: list, write_tokens: bool = False, cache: BuildCache = None, jobs: int = 1) -> list:
+    if cache is None:
+        compiled_classes = compile_classes(files,write_tokens,jobs)
+        return [compiled_classes[file][2] for file in files]
+
+    class_names = {os.path.split(file)[1].split('.')[0]: file for file in files}
+    source_hashes = {class_name: hash_source(file) for class_name, file in class_names.items()}
+    cached = {}                                                 # class name -> cache entry
+
+    for class_name, file in class_names.items():
+        entry = cache.get(class_name,source_hashes[class_name])
+        if entry is None:
+            logging.info(f'Compiling {class_name}, source changed')
+        else:
+            cached[class_name] = entry
+    # class name -> (subroutine signatures, identifiers, VM commands)
+    compiled = {
+        os.path.split(file)[1].split('.')[0]: compiled_class
+        for file, compiled_class in compile_classes([file for class_name, file in class_names.items() if class_name not in cached],write_tokens,jobs).items()
+    }
+
+    signatures = {class_name: entry['signatures'] for class_name, entry in cached.items()}
+    signatures.update({class_name: compiled_class[0] for class_name, compiled_class in compiled.items()})
+    signature_digests = {class_name: signature_digest(class_signatures) for class_name, class_signatures in signatures.items()}
+
+    stale_files = []
+    for class_name, entry in cached.items():
+        if not cache.is_fresh(entry,signature_digests):
+            logging.info(f'Compiling {class_name}, dependency signatures changed')
+            stale_files.append(class_names[class_name])
+    compiled.update({
+        os.path.split(file)[1].split('.')[0]: compiled_class
+        for file, compiled_class in compile_classes(stale_files,write_tokens,jobs).items()
+    })
+
+    for class_name, (class_signatures, identifiers, vm_commands) in compiled.items():
+        dependencies = referenced_classes(identifiers,class_name,set(class_names))
+        cache.store(
+            class_name,
+            source_hashes[class_name],
+            class_signatures,
+            {dependency: signature_digests[dependency] for dependency in sorted(dependencies)},
+            vm_commands
+        )
+    cache.save(set(class_names))
+
+    print(f'Compiled {len(compiled)} of {len(class_names)} classes, {len(class_names)-len(compiled)} reused from {cache.cache_path}')
+    return [compiled[class_name][2] if class_name in compiled else cached[class_name]['vm_commands'] for class_name in class_names]
+
 def main():
     arguments_list = [
         {'name':'file_path','type':str,'help':'specifies the file / directory to be read'}
@@ -834,52 +996,43 @@ def teste():
 
 def main():
     arguments_list = [
-        {'name':'file_path','type':str,'help':'specifies the file / directory to be read'}
+        {'name':'file_path','type':str,'help':'specifies the file / directory to be read'},
+        {'name':'--tokens','action':'store_true','help':'also writes "< file_name >Tokens.xml" for debugging'},
+        {'name':'--incremental','action':'store_true','help':f'only recompiles changed classes and their dependents, caching compiled classes on {BUILD_CACHE_FILE}'},
+        {'name':'--jobs','type':int,'default':1,'help':'number of worker processes compiling classes, 1 compiles them one after another on the current process'},
     ]
-    print(f"{os.path.join(os.getcwd(),sys.argv[1],'vm_commands.log')}")
-    logging.basicConfig(filename=f"{os.path.join(os.getcwd(),sys.argv[1],'vm_commands.log')}", filemode='w', level=logging.DEBUG)
-    logging.info('Started code!')
     parser = argparse.ArgumentParser()
 
     # if more arguments are used, specifies each of them
     for arg in arguments_list:
         parser.add_argument(
-            arg['name'],type=arg['type'],help=arg['help']
+            arg.pop('name'),**arg
         )
     # creates argparse object to get arguments
     args = parser.parse_args()
 
-    processed_files = []
-
     if os.path.isfile(f'{os.path.join(os.getcwd(),args.file_path)}'):
-        CompilationEngine(args.file_path)
-        processed_files.append(os.path.join(os.getcwd(),args.file_path))
+        processed_files = [os.path.join(os.getcwd(),args.file_path)]
+        project_path = os.path.split(processed_files[0])[0]
     else:
-        for file in os.listdir(args.file_path):
-            if file.endswith(".jack"):
-                CompilationEngine(os.path.join(args.file_path,file))
-                processed_files.append(os.path.join(args.file_path,file))
-
-    vm_commands = []
-    for file in processed_files:
-        file_path, file_full_name = os.path.split(file)
-        file_name, file_extension = file_full_name.split('.')
-        xml_tree = ET.parse(f"{os.path.join(os.getcwd(),file_path,file_name+'Syntax.xml')}")
-        # update class variable table, by using "classVarDec" and "classVarDecList" tag
-        class_name = [tag.text for tag in xml_tree.find('className')][0]
+        # sorted, so diagnostics and the output file name don't depend on filesystem order
+        processed_files = [os.path.join(args.file_path,file) for file in sorted(os.listdir(args.file_path)) if file.endswith(".jack")]
+        project_path = args.file_path
 
-        cw = CodeWriter(class_name)
+    print(f"{os.path.join(os.getcwd(),project_path,'vm_commands.log')}")
+    logging.basicConfig(filename=f"{os.path.join(os.getcwd(),project_path,'vm_commands.log')}", filemode='w', level=logging.DEBUG)
+    logging.info('Started code!')
 
-        cw.create_class_symbol_table(xml_tree)
+    cache = BuildCache(os.path.join(project_path,BUILD_CACHE_FILE)) if args.incremental else None
 
-        # checks for subroutines
-        for subroutine_declaration in xml_tree.iterfind('subroutineDec'):
-            subroutine_specs = cw.create_subroutine_symbol_table(subroutine_declaration)
-            vm_commands += cw.write_vm_commands(subroutine_specs,subroutine_declaration)
+    vm_commands = []
+    for class_vm_commands in compile_project(processed_files,args.tokens,cache,args.jobs):
+        vm_commands += class_vm_commands
+    file_name = os.path.split(processed_files[-1])[1].split('.')[0]
     print(vm_commands)
 
         # write full file to 
-    with open(os.path.join(os.path.os.getcwd(),sys.argv[1],file_name+'.vm'),'w') as fp:
+    with open(os.path.join(os.getcwd(),project_path,file_name+'.vm'),'w') as fp:
         fp.write('\n'.join(vm_commands))
 
 if __name__ == '__main__':
@@ -3,11 +3,10 @@ from parser import Parser
 
 # built-in
 import argparse, os
-import xml.etree.ElementTree as ET
 from dataclasses import dataclass
 from typing import Iterable 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SyntaxToken():
     type:   str = None
     value:  str = None
@@ -42,28 +41,25 @@ class CompilationEngine():
     file_path:              str
     current_token:          SyntaxToken = None
     current_token_index:    int = 0
+    write_tokens:           bool = False                        # writes "< file_name >Tokens.xml" for debugging
 
     def __post_init__(self):
         # gets tuple of (file folder, file name with extension)
         self.file_folder, self.file_full_name = os.path.split(self.file_path)
         # file name without extension
         self.file_name = self.file_full_name.split('.')[0]
-        # compiles tokens for path
+        # reads tokens for file in memory, Tokens.xml is only written as debug output
         parser = Parser(self.file_path)
-        parser.parse_files()
-        # tokenized file name to be searched for compilation
-        self.token_file_name = self.file_name + 'Tokens.xml'
-        # path for tokenized file
-        self.token_file_path = os.path.join(self.file_folder,self.token_file_name)
-        # loads up parsed tokenized entry
-        self.xml_tree = ET.parse(self.token_file_path)
+        lexic_tokens = parser.read_tokens(self.file_path)
+        if self.write_tokens:
+            parser.write_tags(xml=parser.parse_token_stream(lexic_tokens),file_name=self.file_name,base_path=self.file_folder or '.')
         # creates tokens
-        self.tokens = self.create_tokens()
+        self.tokens = self.create_tokens(lexic_tokens)
         # executes compilation of generated tokenized parsed entry
         self.execute_compilation()
 
-    def create_tokens(self) -> list:
-        return [SyntaxToken(tag.tag, tag.text) for tag in self.xml_tree.iter() if tag.tag != 'tokens']
+    def create_tokens(self, lexic_tokens: list) -> list:
+        return [SyntaxToken(token.type, token.value) for token in lexic_tokens]
 
     def has_more_tokens(self):
         return True if self.current_token_index < len(self.tokens) else False
@@ -716,7 +712,8 @@ class CompilationEngine():
 
 def main():
     arguments_list = [
-        {'name':'file_path','type':str,'help':'specifies the file / directory to be read'}
+        {'name':'file_path','type':str,'help':'specifies the file / directory to be read'},
+        {'name':'--tokens','action':'store_true','help':'also writes "< file_name >Tokens.xml" for debugging'},
     ]
 
     parser = argparse.ArgumentParser()
@@ -724,22 +721,17 @@ def main():
     # if more arguments are used, specifies each of them
     for arg in arguments_list:
         parser.add_argument(
-            arg['name'],type=arg['type'],help=arg['help']
+            arg.pop('name'),**arg
         )
     # creates argparse object to get arguments
     args = parser.parse_args()
 
-    # Creates instance of parser code
-    parsed_tokens = Parser(file_path=os.path.join(os.getcwd(),args.file_path))
-    # Parses ".jack" files into XML format
-    parsed_tokens.parse_files()
-    
     if os.path.isfile(f'{os.path.join(os.getcwd(),args.file_path)}'):
-        CompilationEngine(args.file_path)        
+        CompilationEngine(args.file_path,write_tokens=args.tokens)        
     else:
         for file in os.listdir(args.file_path):            
             if file.endswith(".jack"):
-                CompilationEngine(os.path.join(args.file_path,file))
+                CompilationEngine(os.path.join(args.file_path,file),write_tokens=args.tokens)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+from lexical_tokenizer import LexicalTokenizer, StreamingLexicalTokenizer
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+# repository root, searched for .jack files
+REPOSITORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+'''
+    Concatenates every .jack file of the repository, copies times
+'''
+def load_corpus(copies: int) -> str:
+    sources = []
+    for directory, _, files in sorted(os.walk(REPOSITORY_PATH)):
+        for file in sorted(files):
+            if file.endswith('.jack'):
+                with open(os.path.join(directory, file), 'r') as input_fp:
+                    sources.append(input_fp.read())
+    return '\n'.join(sources * copies)
+
+'''
+    Times tokenize_method over code, best of repeat runs
+    return:
+        tuple -> (tokens, seconds)
+'''
+def measure(tokenize_method, code: str, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = list(tokenize_method(LexicalTokenizer(code)))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, best
+
+'''
+    Counts tokens of the file without keeping them, reading it as a string or streaming it from a memory map
+    return:
+        tuple -> (tokens, seconds, peak traced memory in bytes)
+'''
+def measure_file(file_path: str, streaming: bool) -> tuple:
+    def count_tokens():
+        if streaming:
+            lexical_tokenizer = StreamingLexicalTokenizer(file_path)
+        else:
+            with open(file_path,'r') as input_fp:
+                lexical_tokenizer = LexicalTokenizer(''.join(input_fp.readlines()))
+        return sum(1 for _ in lexical_tokenizer.tokenize())
+
+    start = time.perf_counter()
+    token_count = count_tokens()
+    elapsed = time.perf_counter() - start
+
+    # traced apart, since tracemalloc slows every allocation
+    tracemalloc.start()
+    count_tokens()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return token_count, elapsed, peak
+
+'''
+    Compares mismatch tokens of both lexers on a source with a non-ASCII character, which must be reported, not fail to decode
+    return:
+        bool -> True when both lexers report the same mismatches
+'''
+def check_non_ascii_mismatch(directory: str) -> bool:
+    code = 'class Main {\n    function void main() {\n        do é;\n    }\n}\n'
+    file_path = os.path.join(directory, 'NonAscii.jack')
+    with open(file_path,'w',encoding='utf-8') as output_fp:
+        output_fp.write(code)
+
+    expected = [(token.type, token.value, token.line, token.column) for token in LexicalTokenizer(code).tokenize() if token.type == 'mismatch']
+    streamed = [(token.type, token.value, token.line, token.column) for token in StreamingLexicalTokenizer(file_path).tokenize() if token.type == 'mismatch']
+    return expected == streamed == [('mismatch', 'é', 3, 12)]
+
+def main():
+    arguments_list = [
+        {'name':'--copies','type':int,'default':200,'help':'number of copies of the repository .jack files in the corpus'},
+        {'name':'--repeat','type':int,'default':3,'help':'runs per lexer, best time is reported'},
+    ]
+
+    parser = argparse.ArgumentParser()
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    code = load_corpus(args.copies)
+    legacy_tokens, legacy_time = measure(LexicalTokenizer.tokenize_by_groupdict, code, args.repeat)
+    tokens, elapsed = measure(LexicalTokenizer.tokenize, code, args.repeat)
+
+    print(f'Corpus: {len(code)} characters, {len(tokens)} tokens')
+    print(f'groupdict: {len(legacy_tokens)/legacy_time:,.0f} tokens/s ({legacy_time:.3f}s)')
+    print(f'compiled:  {len(tokens)/elapsed:,.0f} tokens/s ({elapsed:.3f}s), {legacy_time/elapsed:.1f}x')
+    # comments keep their quotes on the compiled lexer, so only tokens read by the compiler are compared
+    # keywords split out of identifiers, like "int" + "eger", are the only expected differences
+    # the reference lexer doesn't track line / column
+    legacy_tokens = [(token.type, token.value, token.start, token.end) for token in legacy_tokens if token.type not in ['skip','comments']]
+    tokens = [(token.type, token.value, token.start, token.end) for token in tokens if token.type not in ['skip','comments']]
+    differences = sum(1 for legacy_token, token in zip(legacy_tokens, tokens) if legacy_token != token)
+    print(f'Differences: {differences} tokens, {len(legacy_tokens)-len(tokens)} token count difference')
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'Corpus.jack')
+        with open(file_path,'w') as output_fp:
+            output_fp.write(code)
+        for name, streaming in [('readlines', False), ('mmap', True)]:
+            token_count, elapsed, peak = measure_file(file_path, streaming)
+            print(f'{name}: {token_count/elapsed:,.0f} tokens/s, peak memory {peak/(1<<20):.1f} MB')
+        print(f"Non-ASCII mismatch: {'matches' if check_non_ascii_mismatch(directory) else 'does not match'}")
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,16 @@
 from dataclasses import dataclass
+import mmap
 import re
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LexicToken:
     type: str
-    value: str
-    start: int
-    end: int
+    value: str = None
+    start: int = 0  # offsets in the source, 0 for tokens built by hand
+    end: int = 0
+    line: int = 0  # 1-based line of the token start, 0 when not tracked
+    column: int = 0  # 1-based column of the token start
 
 
 @dataclass
@@ -15,11 +18,119 @@ class MismatchedValueError(Exception):
     data: str
 
 
+# Jack keywords, matched only as whole words so identifiers like "integer" aren't split
+KEYWORDS = frozenset({
+    "int",
+    "var",
+    "class",
+    "let",
+    "return",
+    "void",
+    "function",
+    "while",
+    "do",
+    "static",
+    "boolean",
+    "if",
+    "false",
+    "true",
+    "null",
+    "else",
+    "field",
+    "constructor",
+    "this",
+    "method",
+    "char",
+    "that",
+})
+
+SYMBOLS = frozenset({
+    "\\+",
+    "\\-",
+    "\\*",
+    ";",
+    "<",
+    ">",
+    "=",
+    "\\|",
+    "\\&",
+    "\\,",
+    "\\.",
+    ",",
+    "\\[",
+    "\\]",
+    "\\/",
+    "\\(",
+    "\\)",
+    "{",
+    "}",
+    "'",
+    "~",
+})
+
+# token groups, tried in order, keywords sorted longest first so the alternation never stops at a shorter keyword
+TOKEN_SPECIFICATION = [
+    ("comments", r"//.*|/\*[\s\S]*?\*/"),                                       # Gets comments till the end of line
+    ("skip", r"[\s\t\n]+"),                                                      # Skip over spaces and tabs
+    ("keyword", r"(?:" + r"|".join(sorted(KEYWORDS, key=lambda keyword: (-len(keyword), keyword))) + r")\b"),
+    ("symbol", r"|".join(SYMBOLS)),
+    ("mismatch_identifier", r"[0-9]+[a-zA-Z_]+[0-9]*"),                         # Mismatched identifier, starting with a number
+    ("integerConstant", r"\d+"),                                               # Integer number
+    ("identifier", r"[a-zA-Z_0-9]+"),                                           # Identifier
+    ("stringConstant", r'".*"'),                                                # String constant
+    ("mismatch", r"."),                                                         # Any other character
+]
+
+# compiled once, groups have no inner capturing groups so lastgroup is always the token type
+TOKEN_REGEX = re.compile(
+    "|".join(f"(?P<{group_name}>{match})" for group_name, match in TOKEN_SPECIFICATION)
+)
+# same pattern over bytes, for memory-mapped sources, mismatch taking a whole UTF-8 sequence so its value decodes
+TOKEN_BYTES_REGEX = re.compile(
+    b"|".join(
+        f"(?P<{group_name}>".encode("utf-8") + (rb"[\xc0-\xff][\x80-\xbf]*|." if group_name == "mismatch" else match.encode("utf-8")) + b")"
+        for group_name, match in TOKEN_SPECIFICATION
+    )
+)
+# only skip / comments tokens can span lines
+MULTILINE_TOKENS = frozenset({"skip", "comments"})
+
+
 @dataclass
 class LexicalTokenizer:
     code: str
 
+    '''
+        line / column are updated from the newlines of skip / comments tokens only, never rescanning the code
+    '''
     def tokenize(self):
+        line, line_start = 1, 0
+
+        for regex_match in TOKEN_REGEX.finditer(self.code):
+            token_type = regex_match.lastgroup
+            value = regex_match.group()
+            start = regex_match.start()
+
+            yield LexicToken(
+                token_type,
+                value.replace('"', "") if token_type == "stringConstant" else value,
+                start,
+                regex_match.end(),
+                line,
+                start - line_start + 1,
+            )
+
+            if token_type in MULTILINE_TOKENS:
+                newlines = value.count("\n")
+                if newlines:
+                    line += newlines
+                    line_start = start + value.rindex("\n") + 1
+
+    '''
+        Reference implementation, rebuilding the pattern on every call and finding the matched group through groupdict,
+        kept for the lexer benchmark
+    '''
+    def tokenize_by_groupdict(self):
         keywords = {
             "int",
             "var",
@@ -47,23 +158,23 @@ class LexicalTokenizer:
         }
 
         symbols = {
-            "\+",
-            "\-",
-            "\*",
+            "\\+",
+            "\\-",
+            "\\*",
             ";",
             "<",
             ">",
             "=",
-            "\|",
-            "\&",
-            "\,",
-            "\.",
+            "\\|",
+            "\\&",
+            "\\,",
+            "\\.",
             ",",
-            "\[",
-            "\]",
-            "\/",
-            "\(",
-            "\)",
+            "\\[",
+            "\\]",
+            "\\/",
+            "\\(",
+            "\\)",
             "{",
             "}",
             "'",
@@ -104,6 +215,47 @@ class LexicalTokenizer:
             )
 
 
+'''
+    Tokenizes a .jack file lazily over a memory map of it, so memory doesn't grow with the file size
+    start / end / column are byte offsets, the same as character offsets on ASCII sources
+'''
+@dataclass
+class StreamingLexicalTokenizer:
+    file_path: str
+
+    def tokenize(self):
+        with open(self.file_path, "rb") as input_fp:
+            if input_fp.seek(0, 2) == 0:
+                return
+            content = mmap.mmap(input_fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        with content:
+            line, line_start = 1, 0
+
+            for regex_match in TOKEN_BYTES_REGEX.finditer(content):
+                token_type = regex_match.lastgroup
+                value = regex_match.group()
+                start = regex_match.start()
+
+                # sources that aren't UTF-8 still get their mismatch reported, with the stray bytes escaped
+                text = value.decode("utf-8", errors="backslashreplace")
+
+                yield LexicToken(
+                    token_type,
+                    text.replace('"', "") if token_type == "stringConstant" else text,
+                    start,
+                    regex_match.end(),
+                    line,
+                    start - line_start + 1,
+                )
+
+                if token_type in MULTILINE_TOKENS:
+                    newlines = value.count(b"\n")
+                    if newlines:
+                        line += newlines
+                        line_start = start + value.rindex(b"\n") + 1
+
+
 def main():
     statements = """class Point_99 {
         var     a = 8000; // 1aaasasd
@@ -121,7 +273,7 @@ def main():
     for token in lex_tokenizer.tokenize():
         if token.type in ["mismatch", "mismatch_identifier"]:
             raise MismatchedValueError(
-                f"Token error, input '{token.value}' at position ({token.start} to {token.end}) with type '{token.type}', check constraints!"
+                f"Token error, input '{token.value}' at line {token.line}, column {token.column} with type '{token.type}', check constraints!"
             )
         if token.type != "skip":
             tokens.append(token)
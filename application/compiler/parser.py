@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 
 #from yaml import parse
-from lexical_tokenizer import LexicalTokenizer, MismatchedValueError
+from lexical_tokenizer import LexicalTokenizer, StreamingLexicalTokenizer, MismatchedValueError
 import xml.etree.ElementTree as ET
 import argparse, os
 
@@ -20,18 +20,56 @@ class Parser():
             XML tree containing tokens that were parsed
     '''
     def parse_tokens(self,code):
+        return self.parse_token_stream(LexicalTokenizer(code).tokenize())
+
+    '''
+        Desc:
+            Parses tokens of a lexer into XML structure
+        Params:
+            tokens:
+                type: iterable of LexicToken
+                desc: tokens of LexicalTokenizer / StreamingLexicalTokenizer
+        Return:
+            XML tree containing tokens that were parsed
+    '''
+    def parse_token_stream(self,tokens):
         xml = ET.Element('tokens')
 
-        lex_tokenizer = LexicalTokenizer(code)
+        for token in self.filter_tokens(tokens):
+            _tmp = ET.SubElement(xml,token.type)
+            _tmp.text = token.value
+
+        return xml
 
-        for token in lex_tokenizer.tokenize():
+    '''
+        Desc:
+            Drops skip / comments tokens of a lexer, raising on mismatched ones
+        Params:
+            tokens:
+                type: iterable of LexicToken
+                desc: tokens of LexicalTokenizer / StreamingLexicalTokenizer
+        Return:
+            generator of the tokens read by the compilation engine
+    '''
+    def filter_tokens(self,tokens):
+        for token in tokens:
             if token.type == 'mismatch':
-                raise MismatchedValueError(f'Erro de token não especifica "{token.value}", verificar o código')
+                raise MismatchedValueError(f'Erro de token não especifica "{token.value}" na linha {token.line}, coluna {token.column}, verificar o código')
             if token.type not in ['skip','comments']:
-                _tmp = ET.SubElement(xml,token.type)
-                _tmp.text = token.value
+                yield token
 
-        return xml
+    '''
+        Desc:
+            Reads tokens of a ".jack" file in memory, without the round trip through "< file_name >Tokens.xml"
+        Params:
+            file_path:
+                type: string
+                desc: ".jack" file to be read
+        Return:
+            list of LexicToken, in code order
+    '''
+    def read_tokens(self,file_path: str) -> list:
+        return list(self.filter_tokens(StreamingLexicalTokenizer(file_path).tokenize()))
 
     '''
         Desc:
@@ -67,17 +105,13 @@ class Parser():
         if os.path.isfile(self.file_path):
             base_path = os.path.split(self.file_path)
             file_name = base_path[1].split('.')[0]
-            with open(f'{self.file_path}','r') as input_fp:
-                code_lines = ''.join(input_fp.readlines())
-            xml = self.parse_tokens(code_lines)
+            xml = self.parse_token_stream(StreamingLexicalTokenizer(self.file_path).tokenize())
             self.write_tags(xml=xml,file_name=file_name,base_path=base_path[0])
         else:
             for file in os.listdir(self.file_path):
                 if file.endswith(".jack"):
                     file_name = file.split('.')[0]
-                    with open(f'{self.file_path}/{file}','r') as input_fp:
-                        code_lines = ''.join(input_fp.readlines())
-                    xml = self.parse_tokens(code_lines)
+                    xml = self.parse_token_stream(StreamingLexicalTokenizer(f'{self.file_path}/{file}').tokenize())
                     self.write_tags(xml=xml,file_name=file_name)
 
 def main():
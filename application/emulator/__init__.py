@@ -0,0 +1 @@
+# Initializes emulator code module
\ No newline at end of file
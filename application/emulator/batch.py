@@ -0,0 +1,193 @@
+from .cpu import RAM_SIZE
+from .decoder import (
+    OP_ZERO, OP_ONE, OP_MINUS_ONE, OP_D, OP_Y, OP_NOT_D, OP_NOT_Y, OP_NEG_D, OP_NEG_Y, OP_D_PLUS_ONE, OP_Y_PLUS_ONE,
+    OP_D_MINUS_ONE, OP_Y_MINUS_ONE, OP_D_PLUS_Y, OP_D_MINUS_Y, OP_Y_MINUS_D, OP_D_AND_Y, OP_D_OR_Y
+)
+from .emulator import load_program, parse_ram_range
+from dataclasses import dataclass
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:                                             # only needed by the batch emulator
+    np = None
+
+# ALU operation -> function over int32 D / y lane arrays
+OPERATIONS = {
+    OP_ZERO:        lambda D, y: D & 0,
+    OP_ONE:         lambda D, y: (D & 0) + 1,
+    OP_MINUS_ONE:   lambda D, y: (D & 0) - 1,
+    OP_D:           lambda D, y: D,
+    OP_Y:           lambda D, y: y,
+    OP_NOT_D:       lambda D, y: ~D,
+    OP_NOT_Y:       lambda D, y: ~y,
+    OP_NEG_D:       lambda D, y: -D,
+    OP_NEG_Y:       lambda D, y: -y,
+    OP_D_PLUS_ONE:  lambda D, y: D + 1,
+    OP_Y_PLUS_ONE:  lambda D, y: y + 1,
+    OP_D_MINUS_ONE: lambda D, y: D - 1,
+    OP_Y_MINUS_ONE: lambda D, y: y - 1,
+    OP_D_PLUS_Y:    lambda D, y: D + y,
+    OP_D_MINUS_Y:   lambda D, y: D - y,
+    OP_Y_MINUS_D:   lambda D, y: y - D,
+    OP_D_AND_Y:     lambda D, y: D & y,
+    OP_D_OR_Y:      lambda D, y: D | y,
+}
+
+'''
+    Runs the same pre-decoded ROM over N RAM images at once, held as a (lanes, RAM_SIZE) int16 array
+    every step executes the instruction at the lowest PC among running lanes, on all lanes at that PC,
+    so lanes diverging on jumps wait for the others to catch up and reconverge after loops / branches
+    halting rule is the same as HackCPU, per lane
+'''
+@dataclass
+class BatchCPU:
+    program:    list                                            # decode_rom output
+    lanes:      int
+    ram:        object = None                                   # (lanes, RAM_SIZE) int16
+    A:          object = None                                   # per lane registers, int16
+    D:          object = None
+    PC:         object = None                                   # per lane program counter, int32
+    cycles:     object = None                                   # per lane executed instructions, int64
+    halted:     object = None                                   # per lane halt flag
+
+    def __post_init__(self):
+        if np is None:
+            raise ImportError('BatchCPU requires numpy')
+        if self.ram is None:
+            self.ram = np.zeros((self.lanes, RAM_SIZE), dtype=np.int16)
+        for register, dtype in [('A', np.int16), ('D', np.int16), ('PC', np.int32), ('cycles', np.int64)]:
+            if getattr(self, register) is None:
+                setattr(self, register, np.zeros(self.lanes, dtype=dtype))
+        if self.halted is None:
+            self.halted = np.zeros(self.lanes, dtype=bool)
+        # addresses jumping to a "(X) @X 0;JMP" end loop halt when reaching pc or pc-1
+        self.end_loops = np.array(
+            [pc > 0 and self.program[pc - 1] == pc - 1 for pc in range(len(self.program) + 1)], dtype=bool
+        )
+
+    '''
+        runs lanes until all of them halted or executed max_cycles instructions on this call
+        return:
+            int -> number of instructions executed across lanes
+    '''
+    def run(self, max_cycles: int = None) -> int:
+        program = self.program
+        ram = self.ram.reshape(-1)                              # lane l, address a -> l*RAM_SIZE + a
+        A, D, PC, cycles, halted = self.A, self.D, self.PC, self.cycles, self.halted
+        program_size = len(program)
+        start_cycles = cycles.copy()
+        cycle_limit = start_cycles + max_cycles if max_cycles is not None else None
+
+        running = np.flatnonzero(~halted & (PC < program_size) & (cycle_limit > start_cycles if cycle_limit is not None else True))
+        halted[(PC >= program_size)] = True
+
+        while running.size:
+            pcs = PC[running]
+            pc = int(pcs.min())
+            lanes = running if pc == pcs.max() else running[pcs == pc]
+            instruction = program[pc]
+            cycles[lanes] += 1
+
+            if instruction.__class__ is int:                    # A-Instruction
+                A[lanes] = instruction
+                PC[lanes] = pc + 1
+                stopped = None
+            else:
+                a = A[lanes].astype(np.int32) & 0x7FFF
+                addresses = lanes * RAM_SIZE + a if instruction.reads_m or instruction.writes_m else None
+                y = ram[addresses].astype(np.int32) if instruction.reads_m else A[lanes].astype(np.int32)
+                operation = OPERATIONS.get(instruction.operation)
+                if operation is None:
+                    x = compute_alu(instruction.comp, D[lanes].astype(np.int32), y)
+                else:
+                    x = operation(D[lanes].astype(np.int32), y)
+                x = np.broadcast_to(x, lanes.shape).astype(np.int16)   # wraps to 16 bits
+
+                # RAM[A] and jump address use A-Reg value before this instruction
+                if instruction.writes_m:
+                    ram[addresses] = x
+                if instruction.writes_a:
+                    A[lanes] = x
+                if instruction.writes_d:
+                    D[lanes] = x
+
+                stopped = None
+                jump = instruction.jump
+                if jump is None:
+                    PC[lanes] = pc + 1
+                else:
+                    negative, zero, positive = jump
+                    taken = (negative & (x < 0)) | (zero & (x == 0)) | (positive & (x > 0))
+                    PC[lanes] = np.where(taken, a, pc + 1)
+                    if not (instruction.writes_a or instruction.writes_d or instruction.writes_m):
+                        end_loop = taken & ((a == pc) | ((a == pc - 1) & self.end_loops[pc]))
+                        if end_loop.any():
+                            halted[lanes[end_loop]] = True
+                            stopped = True
+
+            left = lanes[PC[lanes] >= program_size]             # lanes leaving the ROM, falling through or jumping past it
+            if left.size:
+                halted[left] = True
+                stopped = True
+            if cycle_limit is not None and (cycles[lanes] >= cycle_limit[lanes]).any():
+                stopped = True
+            if stopped:
+                running = running[~halted[running] & (cycle_limit[running] > cycles[running] if cycle_limit is not None else True)]
+
+        return int((cycles - start_cycles).sum())
+
+'''
+    Computes ALU output from the comp bits over lane arrays, for comp codes without an OP_* operation
+'''
+def compute_alu(comp: int, x, y):
+    if comp & 0b100000: x = x & 0
+    if comp & 0b010000: x = ~x
+    if comp & 0b001000: y = y & 0
+    if comp & 0b000100: y = ~y
+    output = x + y if comp & 0b000010 else x & y
+    if comp & 0b000001: output = ~output
+    return output
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    arguments_list = [
+        {'name':'file_name','type':str,'help':'specifies the .hack / .bin ROM image to be run'},
+        {'name':'--lanes','type':int,'default':1000,'help':'number of RAM images run in lockstep'},
+        {'name':'--max-cycles','type':int,'default':None,'help':'stops each lane after executing this number of instructions'},
+        {'name':'--random','type':parse_ram_range,'action':'append','default':[],'help':'fills RAM addresses of each lane with random values, as <address> or <start>:<end>'},
+        {'name':'--low','type':int,'default':-32768,'help':'lowest random RAM value'},
+        {'name':'--high','type':int,'default':32767,'help':'highest random RAM value'},
+        {'name':'--seed','type':int,'default':0,'help':'seed of random RAM values'},
+        {'name':'--ram','type':parse_ram_range,'action':'append','default':[],'help':'prints RAM addresses of the first lanes after running, as <address> or <start>:<end>'},
+    ]
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error('batch emulator requires numpy')
+
+    cpu = BatchCPU(load_program(args.file_name), args.lanes)
+    generator = np.random.default_rng(args.seed)
+    for ram_range in args.random:
+        cpu.ram[:, ram_range.start:ram_range.stop] = generator.integers(args.low, args.high, (args.lanes, len(ram_range)), endpoint=True)
+
+    start = time.perf_counter()
+    executed = cpu.run(args.max_cycles)
+    elapsed = time.perf_counter() - start
+
+    print(f'{int(cpu.halted.sum())}/{args.lanes} lanes halted, {executed} instructions ({int(cpu.cycles.min())}..{int(cpu.cycles.max())} per lane)')
+    print(f'Ran in {elapsed:.3f}s ({executed/elapsed if elapsed else 0:,.0f} aggregate instructions/s)')
+    for ram_range in args.ram:
+        for address in ram_range:
+            print(f'RAM[{address}] = {cpu.ram[:8, address].tolist()}')
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,168 @@
+from dataclasses import dataclass, field
+from .cpu import HackCPU
+from .decoder import (
+    OP_ZERO, OP_ONE, OP_MINUS_ONE, OP_D, OP_Y, OP_NOT_D, OP_NOT_Y, OP_NEG_D, OP_NEG_Y, OP_D_PLUS_ONE, OP_Y_PLUS_ONE,
+    OP_D_MINUS_ONE, OP_Y_MINUS_ONE, OP_D_PLUS_Y, OP_D_MINUS_Y, OP_Y_MINUS_D, OP_D_AND_Y, OP_D_OR_Y, OP_ALU, compute_alu
+)
+
+# ALU operation -> (python expression over D and {y}, output may leave the 16-bit range)
+OPERATION_EXPRESSIONS = {
+    OP_ZERO:        ('0', False),
+    OP_ONE:         ('1', False),
+    OP_MINUS_ONE:   ('-1', False),
+    OP_D:           ('D', False),
+    OP_Y:           ('{y}', False),
+    OP_NOT_D:       ('~D', False),
+    OP_NOT_Y:       ('~{y}', False),
+    OP_NEG_D:       ('-D', True),
+    OP_NEG_Y:       ('-{y}', True),
+    OP_D_PLUS_ONE:  ('D + 1', True),
+    OP_Y_PLUS_ONE:  ('{y} + 1', True),
+    OP_D_MINUS_ONE: ('D - 1', True),
+    OP_Y_MINUS_ONE: ('{y} - 1', True),
+    OP_D_PLUS_Y:    ('D + {y}', True),
+    OP_D_MINUS_Y:   ('D - {y}', True),
+    OP_Y_MINUS_D:   ('{y} - D', True),
+    OP_D_AND_Y:     ('D & {y}', False),
+    OP_D_OR_Y:      ('D | {y}', False),
+    OP_ALU:         ('compute_alu({comp}, D, {y})', True),
+}
+
+# jump conditions (negative, zero, positive) -> python condition over x
+JUMP_EXPRESSIONS = {
+    (False, False, True):   'x > 0',
+    (False, True, False):   'x == 0',
+    (False, True, True):    'x >= 0',
+    (True, False, False):   'x < 0',
+    (True, False, True):    'x != 0',
+    (True, True, False):    'x <= 0',
+    (True, True, True):     'True',
+}
+
+# longest straight-line run compiled into a single block
+MAX_BLOCK_SIZE = 256
+
+'''
+    Compiles pre-decoded ROM into basic blocks, each block being a python function generated on first entry and cached
+    a block starts at the address execution entered it and ends on its first jump instruction, so jump targets
+    (including computed ones, like return addresses) always start their own block
+    block function:
+        params: ram, A, D
+        return: (A, D, next PC, instructions executed), next PC being -target-1 when the block jumped to an end loop
+'''
+@dataclass
+class BlockCompiler:
+    program:        list                                        # decode_rom output
+    blocks:         dict = field(default_factory=dict)          # entry address -> (block function, instructions on longest path)
+    max_block_size: int = MAX_BLOCK_SIZE
+
+    def get_block(self, address: int) -> tuple:
+        block = self.blocks.get(address)
+        if block is None:
+            block = self.blocks[address] = self.compile_block(address)
+        return block
+
+    '''
+        generates python source of the block starting at address
+        A-Reg values loaded by A-Instructions are folded into RAM addresses / jump targets until A-Reg is written by the ALU
+        return:
+            tuple -> (source, instructions on longest path)
+    '''
+    def generate_block_source(self, address: int) -> tuple:
+        code = [f'def block(ram, A, D):']
+        known_a = None                                          # A-Reg value known at compile time
+        pc = address
+        count = 0
+
+        while pc < len(self.program) and count < self.max_block_size:
+            instruction = self.program[pc]
+            count += 1
+
+            if instruction.__class__ is int:                    # A-Instruction
+                code.append(f'    A = {instruction}')
+                known_a = instruction
+                pc += 1
+                continue
+
+            y_address = f'{known_a & 0x7FFF}' if known_a is not None else 'A & 32767'
+            y = f'ram[{y_address}]' if instruction.reads_m else ('A' if known_a is None else f'{known_a}')
+            expression, may_overflow = OPERATION_EXPRESSIONS[instruction.operation]
+            expression = expression.format(y=y, comp=instruction.comp)
+            if may_overflow:
+                expression = f'(({expression} + 32768) & 65535) - 32768'
+
+            code.append(f'    x = {expression}')
+            if instruction.writes_m:
+                code.append(f'    ram[{y_address}] = x')
+            if instruction.jump is not None:
+                code.append(f"    target = {f'{known_a & 0x7FFF}' if known_a is not None else 'A & 32767'}")
+            if instruction.writes_a:
+                code.append('    A = x')
+                known_a = None
+            if instruction.writes_d:
+                code.append('    D = x')
+
+            if instruction.jump is not None:
+                target = 'target'
+                # end loop of the program, same rule as HackCPU, checked at run time when A-Reg isn't known
+                end_loop = [pc] + ([pc - 1] if pc > 0 and self.program[pc - 1] == pc - 1 else [])
+                if not (instruction.writes_a or instruction.writes_d or instruction.writes_m):
+                    if known_a is None:
+                        target = f"-target - 1 if target in {tuple(end_loop)} else target"
+                    elif known_a in end_loop:
+                        target = '-target - 1'
+                code.append(f'    if {JUMP_EXPRESSIONS[instruction.jump]}:')
+                code.append(f'        return A, D, {target}, {count}')
+                pc += 1
+                break
+            pc += 1
+
+        code.append(f'    return A, D, {pc}, {count}')
+        return '\n'.join(code), count
+
+    def compile_block(self, address: int) -> tuple:
+        source, count = self.generate_block_source(address)
+        namespace = {'compute_alu': compute_alu}
+        exec(compile(source, f'<hack block {address}>', 'exec'), namespace)
+        return namespace['block'], count
+
+'''
+    Hack CPU running compiled basic blocks, falls back to HackCPU interpreter when a block would exceed max_cycles
+'''
+@dataclass
+class BlockCPU(HackCPU):
+    compiler:   BlockCompiler = None                            # shared by CPUs running the same program, created if not passed
+
+    def __post_init__(self):
+        if self.compiler is None:
+            self.compiler = BlockCompiler(self.program)
+
+    def run(self, max_cycles: int = None) -> int:
+        ram = self.ram
+        blocks = self.compiler.blocks
+        get_block = self.compiler.get_block
+        A, D, pc = self.A, self.D, self.PC
+        program_size = len(self.program)
+        start_cycles = cycles = self.cycles
+        cycle_limit = cycles + max_cycles if max_cycles is not None else float('inf')
+        halted = False
+
+        while True:
+            if pc >= program_size:
+                halted = True
+                break
+            block, count = blocks.get(pc) or get_block(pc)
+            if cycles + count > cycle_limit:                    # runs the remaining cycles one instruction at a time
+                self.A, self.D, self.PC, self.cycles = A, D, pc, cycles
+                HackCPU.run(self, cycle_limit - cycles)
+                return self.cycles - start_cycles
+            A, D, pc, executed = block(ram, A, D)
+            cycles += executed
+            if pc < 0:
+                pc = -pc - 1
+                halted = True
+                break
+
+        self.A, self.D, self.PC, self.cycles = A, D, pc, cycles
+        self.halted = halted
+        return cycles - start_cycles
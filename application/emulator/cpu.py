@@ -0,0 +1,102 @@
+from array import array
+from dataclasses import dataclass, field
+from .decoder import (
+    OP_ZERO, OP_ONE, OP_MINUS_ONE, OP_D, OP_Y, OP_NOT_D, OP_NOT_Y, OP_NEG_D, OP_NEG_Y, OP_D_PLUS_ONE, OP_Y_PLUS_ONE,
+    OP_D_MINUS_ONE, OP_Y_MINUS_ONE, OP_D_PLUS_Y, OP_D_MINUS_Y, OP_Y_MINUS_D, OP_D_AND_Y, OP_D_OR_Y, compute_alu
+)
+
+# 16K RAM + screen + keyboard, addressed by the 15 lower bits of A-Reg
+RAM_SIZE = 1 << 15
+
+'''
+    Hack CPU running pre-decoded ROM over a signed 16-bit RAM
+    halts when PC leaves the ROM or a jump without destination lands on a loop that can't change state:
+        jumping to itself, or to the @X at address X jumping back to it, "(END) @END 0;JMP"
+'''
+@dataclass
+class HackCPU:
+    program:    list                                                                    # decode_rom output
+    ram:        array = field(default_factory=lambda: array('h', bytes(RAM_SIZE*2)))
+    A:          int = 0
+    D:          int = 0
+    PC:         int = 0
+    cycles:     int = 0
+    halted:     bool = False
+
+    '''
+        runs until halt or max_cycles instructions were executed
+        return:
+            int -> number of instructions executed by this call
+    '''
+    def run(self, max_cycles: int = None) -> int:
+        program = self.program
+        ram = self.ram
+        A, D, pc = self.A, self.D, self.PC
+        program_size = len(program)
+        start_cycles = cycles = self.cycles
+        cycle_limit = cycles + max_cycles if max_cycles is not None else float('inf')
+        halted = False
+
+        while cycles < cycle_limit:
+            if pc >= program_size:
+                halted = True
+                break
+            instruction = program[pc]
+            cycles += 1
+
+            if instruction.__class__ is int:                                            # A-Instruction
+                A = instruction
+                pc += 1
+                continue
+
+            operation = instruction.operation
+            y = ram[A & 0x7FFF] if instruction.reads_m else A
+
+            # most frequent operations on translated VM code first
+            if operation == OP_Y:                   x = y
+            elif operation == OP_D:                 x = D
+            elif operation == OP_Y_MINUS_ONE:       x = y - 1
+            elif operation == OP_Y_PLUS_ONE:        x = y + 1
+            elif operation == OP_D_PLUS_Y:          x = D + y
+            elif operation == OP_Y_MINUS_D:         x = y - D
+            elif operation == OP_D_MINUS_Y:         x = D - y
+            elif operation == OP_ZERO:              x = 0
+            elif operation == OP_MINUS_ONE:         x = -1
+            elif operation == OP_ONE:               x = 1
+            elif operation == OP_D_PLUS_ONE:        x = D + 1
+            elif operation == OP_D_MINUS_ONE:       x = D - 1
+            elif operation == OP_D_AND_Y:           x = D & y
+            elif operation == OP_D_OR_Y:            x = D | y
+            elif operation == OP_NOT_D:             x = ~D
+            elif operation == OP_NOT_Y:             x = ~y
+            elif operation == OP_NEG_D:             x = -D
+            elif operation == OP_NEG_Y:             x = -y
+            else:                                   x = compute_alu(instruction.comp, D, y)
+
+            if not -32768 <= x <= 32767:                                                # wraps to 16 bits
+                x = ((x + 32768) & 0xFFFF) - 32768
+
+            # RAM[A] and jump address use A-Reg value before this instruction
+            if instruction.writes_m:
+                ram[A & 0x7FFF] = x
+            jump = instruction.jump
+            target = A
+            if instruction.writes_a:
+                A = x
+            if instruction.writes_d:
+                D = x
+
+            if jump is not None and jump[(x > 0) - (x < 0) + 1]:
+                target &= 0x7FFF
+                if not (instruction.writes_a or instruction.writes_d or instruction.writes_m) and \
+                    (target == pc or (target == pc - 1 and program[target] == target)):
+                    halted = True
+                    pc = target
+                    break
+                pc = target
+            else:
+                pc += 1
+
+        self.A, self.D, self.PC, self.cycles = A, D, pc, cycles
+        self.halted = halted
+        return cycles - start_cycles
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+
+'''
+    ALU operations, y being A-Reg or RAM[A] depending on the a-bit of the C-Instruction
+'''
+OP_ZERO         = 0
+OP_ONE          = 1
+OP_MINUS_ONE    = 2
+OP_D            = 3
+OP_Y            = 4
+OP_NOT_D        = 5
+OP_NOT_Y        = 6
+OP_NEG_D        = 7
+OP_NEG_Y        = 8
+OP_D_PLUS_ONE   = 9
+OP_Y_PLUS_ONE   = 10
+OP_D_MINUS_ONE  = 11
+OP_Y_MINUS_ONE  = 12
+OP_D_PLUS_Y     = 13
+OP_D_MINUS_Y    = 14
+OP_Y_MINUS_D    = 15
+OP_D_AND_Y      = 16
+OP_D_OR_Y       = 17
+OP_ALU          = 18                                            # comp bits outside the Hack instruction set, computed bit by bit
+
+# comp bits (zx nx zy ny f no) -> operation
+COMP_OPERATIONS = {
+    0b101010: OP_ZERO,
+    0b111111: OP_ONE,
+    0b111010: OP_MINUS_ONE,
+    0b001100: OP_D,
+    0b110000: OP_Y,
+    0b001101: OP_NOT_D,
+    0b110001: OP_NOT_Y,
+    0b001111: OP_NEG_D,
+    0b110011: OP_NEG_Y,
+    0b011111: OP_D_PLUS_ONE,
+    0b110111: OP_Y_PLUS_ONE,
+    0b001110: OP_D_MINUS_ONE,
+    0b110010: OP_Y_MINUS_ONE,
+    0b000010: OP_D_PLUS_Y,
+    0b010011: OP_D_MINUS_Y,
+    0b000111: OP_Y_MINUS_D,
+    0b000000: OP_D_AND_Y,
+    0b010101: OP_D_OR_Y,
+}
+
+# jump bits -> jump taken for (negative, zero, positive) ALU output, None if the instruction never jumps
+JUMP_CONDITIONS = [None] + [((jump & 4) > 0, (jump & 2) > 0, (jump & 1) > 0) for jump in range(1,8)]
+
+'''
+    C-Instruction decoded once, before running
+'''
+@dataclass(frozen=True, slots=True)
+class Instruction:
+    operation:  int                                             # OP_* ALU operation
+    reads_m:    bool                                            # y is RAM[A] instead of A-Reg
+    writes_a:   bool
+    writes_d:   bool
+    writes_m:   bool
+    jump:       tuple                                           # JUMP_CONDITIONS entry
+    comp:       int                                             # raw comp bits, used by OP_ALU
+
+'''
+    Decodes instruction words, A-Instructions are kept as their int value, C-Instructions become Instruction
+    identical C-Instructions share the same Instruction
+    return:
+        list -> one int / Instruction per word
+'''
+def decode_rom(words) -> list:
+    decoded_words = {}
+    program = []
+    for word in words:
+        if word & 0x8000 == 0:                                  # A-Instruction
+            program.append(word)
+            continue
+        if word not in decoded_words:
+            comp = (word >> 6) & 0b111111
+            decoded_words[word] = Instruction(
+                COMP_OPERATIONS.get(comp, OP_ALU),
+                (word >> 12) & 1 == 1,
+                (word >> 5) & 1 == 1,
+                (word >> 4) & 1 == 1,
+                (word >> 3) & 1 == 1,
+                JUMP_CONDITIONS[word & 0b111],
+                comp
+            )
+        program.append(decoded_words[word])
+    return program
+
+'''
+    Computes ALU output from the comp bits, for comp codes without an OP_* operation
+'''
+def compute_alu(comp: int, x: int, y: int) -> int:
+    if comp & 0b100000: x = 0
+    if comp & 0b010000: x = ~x
+    if comp & 0b001000: y = 0
+    if comp & 0b000100: y = ~y
+    output = x + y if comp & 0b000010 else x & y
+    if comp & 0b000001: output = ~output
+    return output
@@ -0,0 +1,57 @@
+from assembler.rom_image import load_rom
+from .block_compiler import BlockCPU
+from .cpu import HackCPU
+from .decoder import decode_rom
+import argparse
+import time
+
+# --backend choices
+BACKENDS = {
+    'interpreter':  HackCPU,
+    'blocks':       BlockCPU,
+}
+
+'''
+    Loads .hack / .bin ROM image and decodes it for HackCPU
+'''
+def load_program(file_name: str) -> list:
+    return decode_rom(load_rom(file_name).words)
+
+'''
+    Parses "<start>:<end>" / "<address>" RAM ranges
+'''
+def parse_ram_range(ram_range: str) -> range:
+    start, _, end = ram_range.partition(':')
+    return range(int(start), int(end) if end else int(start)+1)
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    arguments_list = [
+        {'name':'file_name','type':str,'help':'specifies the .hack / .bin ROM image to be run'},
+        {'name':'--max-cycles','type':int,'default':None,'help':'stops after executing this number of instructions'},
+        {'name':'--backend','type':str,'choices':list(BACKENDS),'default':'interpreter','help':'runs instruction by instruction, or as basic blocks compiled to python on first entry'},
+        {'name':'--ram','type':parse_ram_range,'action':'append','default':[],'help':'prints RAM addresses after running, as <address> or <start>:<end>'},
+    ]
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cpu = BACKENDS[args.backend](load_program(args.file_name))
+    loaded = time.perf_counter()
+    cpu.run(args.max_cycles)
+    elapsed = time.perf_counter() - loaded
+
+    print(f"{'Halted' if cpu.halted else 'Stopped'} at PC={cpu.PC} after {cpu.cycles} cycles")
+    print(f'Loaded in {loaded-start:.3f}s, ran in {elapsed:.3f}s ({cpu.cycles/elapsed if elapsed else 0:,.0f} instructions/s)')
+    for ram_range in args.ram:
+        for address in ram_range:
+            print(f'RAM[{address}] = {cpu.ram[address]}')
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,237 @@
+from assembler.source_map import NO_ORIGIN, SourceOrigin, load_source_map
+from dataclasses import dataclass, field
+from .block_compiler import BlockCompiler
+from .cpu import HackCPU
+from .emulator import load_program
+import argparse
+import os
+import time
+
+# origin of the code running before the first source marker
+BOOTSTRAP_ORIGIN = SourceOrigin('-', 0, '-', 'bootstrap')
+# function name of the stack frame running before the first call
+ROOT_FUNCTION = '(bootstrap)'
+
+'''
+    Profiles a Hack program built with --source-map, running the basic blocks of BlockCompiler
+    every block runs straight until its last instruction, so its cycles are recorded once per block, and split per VM command when reporting
+    cycles of shared code (call / return / comparison routines) go to the last VM command executed before it
+    call stack follows function entries, pushed when a block reaches the entry address of a function,
+    and popped when a return jumps out of the return / shared code
+'''
+@dataclass
+class Profiler:
+    cpu:            HackCPU
+    source_map:     object                                      # assembler.source_map.SourceMap
+    compiler:       BlockCompiler = None
+    stacks:         list = field(default_factory=lambda: [(None, ROOT_FUNCTION)])     # stack id -> (parent stack id, function)
+    stack_ids:      dict = field(default_factory=dict)          # (parent stack id, function) -> stack id
+    samples:        dict = field(default_factory=dict)          # (stack id, block address, instructions, origin before block) -> executions
+    calls:          dict = field(default_factory=dict)          # (caller, callee) -> number of calls
+    stack:          int = 0                                     # current stack id
+    origin:         int = None                                  # origin of the last VM command executed
+
+    def __post_init__(self):
+        if self.compiler is None:
+            self.compiler = BlockCompiler(self.cpu.program)
+        self.origins = self.source_map.origins + [BOOTSTRAP_ORIGIN]
+        self.addresses = self.source_map.addresses
+        self.entries = {address: function for function, address in self.source_map.functions.items()}
+        self.returns = [origin.command == 'return' for origin in self.origins]
+        self.last_origins = {}                                  # (block address, instructions) -> last origin of the block, None if only shared code
+        if self.origin is None:
+            self.origin = len(self.origins) - 1
+
+    def last_origin(self, address: int, instructions: int) -> int:
+        for origin in reversed(self.addresses[address:address+instructions]):
+            if origin != NO_ORIGIN:
+                return origin
+        return None
+
+    def enter_function(self, function: str):
+        caller = self.stacks[self.stack][1]
+        self.calls[(caller, function)] = self.calls.get((caller, function), 0) + 1
+        key = (self.stack, function)
+        stack = self.stack_ids.get(key)
+        if stack is None:
+            stack = self.stack_ids[key] = len(self.stacks)
+            self.stacks.append(key)
+        self.stack = stack
+
+    '''
+        runs until halt or max_cycles instructions were executed, same semantics as HackCPU.run
+        return:
+            int -> number of instructions executed by this call
+    '''
+    def run(self, max_cycles: int = None) -> int:
+        cpu = self.cpu
+        ram = cpu.ram
+        blocks = self.compiler.blocks
+        get_block = self.compiler.get_block
+        samples = self.samples
+        addresses = self.addresses
+        entries = self.entries
+        returns = self.returns
+        last_origins = self.last_origins
+        A, D, pc = cpu.A, cpu.D, cpu.PC
+        program_size = len(cpu.program)
+        start_cycles = cycles = cpu.cycles
+        cycle_limit = cycles + max_cycles if max_cycles is not None else float('inf')
+        halted = False
+
+        while True:
+            if pc >= program_size:
+                halted = True
+                break
+            block, count = blocks.get(pc) or get_block(pc)
+            if cycles + count > cycle_limit:                    # runs the remaining straight-line instructions on HackCPU
+                key = (self.stack, pc, cycle_limit - cycles, self.origin)
+                samples[key] = samples.get(key, 0) + 1
+                cpu.A, cpu.D, cpu.PC, cpu.cycles = A, D, pc, cycles
+                HackCPU.run(cpu, cycle_limit - cycles)
+                return cpu.cycles - start_cycles
+            A, D, next_pc, executed = block(ram, A, D)
+            cycles += executed
+
+            key = (self.stack, pc, executed, self.origin)
+            samples[key] = samples.get(key, 0) + 1
+            block_key = (pc, executed)
+            if block_key not in last_origins:
+                last_origins[block_key] = self.last_origin(pc, executed)
+            if last_origins[block_key] is not None:
+                self.origin = last_origins[block_key]
+
+            if next_pc < 0:
+                pc = -next_pc - 1
+                halted = True
+                break
+            if next_pc in entries:
+                self.enter_function(entries[next_pc])
+            elif next_pc != pc + executed and returns[self.origin] and next_pc < len(addresses) and addresses[next_pc] != NO_ORIGIN:
+                self.stack = self.stacks[self.stack][0] or 0
+            pc = next_pc
+
+        cpu.A, cpu.D, cpu.PC, cpu.cycles = A, D, pc, cycles
+        cpu.halted = halted
+        return cycles - start_cycles
+
+    '''
+        splits recorded blocks into cycles per origin, per function on top of the stack and per stack
+        return:
+            tuple -> (origin -> cycles, function -> self cycles, stack id -> cycles)
+    '''
+    def aggregate(self) -> tuple:
+        origin_cycles = {}
+        function_cycles = {}
+        stack_cycles = {}
+        addresses = self.addresses
+
+        for (stack, address, instructions, origin), executions in self.samples.items():
+            cycles = instructions * executions
+            stack_cycles[stack] = stack_cycles.get(stack, 0) + cycles
+            function = self.stacks[stack][1]
+            function_cycles[function] = function_cycles.get(function, 0) + cycles
+            for block_origin in addresses[address:address+instructions]:
+                if block_origin != NO_ORIGIN:
+                    origin = block_origin
+                origin_cycles[origin] = origin_cycles.get(origin, 0) + executions
+
+        return origin_cycles, function_cycles, stack_cycles
+
+    def stack_path(self, stack: int) -> list:
+        path = []
+        while stack:
+            stack, function = self.stacks[stack]
+            path.append(function)
+        return path[::-1] or [ROOT_FUNCTION]
+
+    '''
+        flamegraph collapsed stacks, one "caller;callee cycles" line per call stack
+    '''
+    def collapsed_stacks(self) -> list:
+        _, _, stack_cycles = self.aggregate()
+        return sorted(f"{';'.join(self.stack_path(stack))} {cycles}" for stack, cycles in stack_cycles.items())
+
+    '''
+        flat profiles per VM command type, function and VM line, followed by the call graph
+    '''
+    def report(self, top: int = 20) -> str:
+        origin_cycles, function_cycles, stack_cycles = self.aggregate()
+        total = sum(stack_cycles.values()) or 1
+
+        command_cycles = {}
+        for origin, cycles in origin_cycles.items():
+            command = self.origins[origin].command
+            command_cycles[command] = command_cycles.get(command, 0) + cycles
+
+        inclusive_cycles = {}
+        for stack, cycles in stack_cycles.items():
+            for function in set(self.stack_path(stack)):
+                inclusive_cycles[function] = inclusive_cycles.get(function, 0) + cycles
+
+        call_counts = {}
+        for (_, callee), calls in self.calls.items():
+            call_counts[callee] = call_counts.get(callee, 0) + calls
+
+        report = [f'Profile: {total} cycles', '', 'Flat profile by VM command:', f"{'cycles':>12} {'%':>6}  command"]
+        for command, cycles in sorted(command_cycles.items(), key=lambda item: -item[1]):
+            report.append(f'{cycles:>12} {cycles/total*100:>6.2f}  {command}')
+
+        report += ['', 'Flat profile by function:', f"{'self':>12} {'%':>6} {'inclusive':>12} {'%':>6} {'calls':>8}  function"]
+        for function, cycles in sorted(function_cycles.items(), key=lambda item: -item[1]):
+            inclusive = inclusive_cycles.get(function, 0)
+            report.append(f'{cycles:>12} {cycles/total*100:>6.2f} {inclusive:>12} {inclusive/total*100:>6.2f} {call_counts.get(function, 0):>8}  {function}')
+
+        report += ['', f'Flat profile by VM line (top {top}):', f"{'cycles':>12} {'%':>6}  line / function / command"]
+        for origin, cycles in sorted(origin_cycles.items(), key=lambda item: -item[1])[:top]:
+            source = self.origins[origin]
+            report.append(f'{cycles:>12} {cycles/total*100:>6.2f}  {source} {source.function} {source.command}')
+
+        report += ['', 'Call graph:']
+        for function, inclusive in sorted(inclusive_cycles.items(), key=lambda item: -item[1]):
+            report.append(f'{function}: {function_cycles.get(function, 0)} self, {inclusive} inclusive, {call_counts.get(function, 0)} calls')
+            for (caller, callee), calls in sorted(self.calls.items(), key=lambda item: -item[1]):
+                if callee == function:
+                    report.append(f'    <- {caller} ({calls} calls)')
+            for (caller, callee), calls in sorted(self.calls.items(), key=lambda item: -item[1]):
+                if caller == function:
+                    report.append(f'    -> {callee} ({calls} calls)')
+
+        return '\n'.join(report)
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    arguments_list = [
+        {'name':'file_name','type':str,'help':'specifies the .hack / .bin ROM image to be profiled, assembled from code translated with --source-map'},
+        {'name':'--map','type':str,'default':None,'help':'source map written by the assembler, defaults to the ROM image name with .map extension'},
+        {'name':'--max-cycles','type':int,'default':None,'help':'stops after executing this number of instructions'},
+        {'name':'--top','type':int,'default':20,'help':'number of VM lines on the flat profile'},
+        {'name':'--collapsed','type':str,'default':None,'help':'writes flamegraph collapsed stacks to this file'},
+    ]
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    profiler = Profiler(
+        HackCPU(load_program(args.file_name)),
+        load_source_map(args.map or f'{os.path.splitext(args.file_name)[0]}.map')
+    )
+
+    start = time.perf_counter()
+    profiler.run(args.max_cycles)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Halted' if profiler.cpu.halted else 'Stopped'} at PC={profiler.cpu.PC} after {profiler.cpu.cycles} cycles, ran in {elapsed:.3f}s")
+    print(profiler.report(args.top))
+
+    if args.collapsed:
+        with open(args.collapsed,'w') as output_fp:
+            output_fp.write('\n'.join(profiler.collapsed_stacks()) + '\n')
+
+if __name__=='__main__':
+    main()
@@ -1,5 +1,5 @@
 # created code
-from lexical_tokenizer import LexicalTokenizer, LexicToken, MismatchedValueError
+from lexical_tokenizer import LexicalTokenizer, StreamingLexicalTokenizer, LexicToken, MismatchedValueError
 
 # built-in
 from dataclasses import dataclass
@@ -14,7 +14,7 @@ class Position(Enum):
 # functional syntax
 Position = Enum('Position', ['CURRENT', 'NEXT'])
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SyntaxToken:
     type: str = None
     value: str = None
@@ -44,9 +44,7 @@ class CompilationEngine:
         if os.path.isfile(path):
             base_path = os.path.split(path)
             file_name = base_path[1].split(".")[0]
-            with open(f"{path}", "r") as input_fp:
-                code_lines = "".join(input_fp.readlines())
-            self.tokenize(code_lines)
+            self.lexical_generator = StreamingLexicalTokenizer(path).tokenize()
 
         else:
             for file in os.listdir(path):
@@ -56,29 +54,24 @@ class CompilationEngine:
                         code_lines = "".join(input_fp.readlines())
 
     """
-        Def: parses line into its lexical tokens from the generator object, ignoring 'skip' and 'comments' types, yields a tuple with current and next token respectively
+        Def: parses file into its lexical tokens, streamed from a memory map, so comments may span lines, ignoring 'skip' and 'comments' types, yields a tuple with current and next token respectively
         Params:
             - file_path (type: str)
         Example:
             - CompilationEngine.parse_line('<path to file>')
     """
     def parse_lines(self, file_path: str):
-        for line in self.read_lines(file_path):
-            print(f"{self.line_number}: {line}")
-            lex_tokenizer = LexicalTokenizer(line)
-
-            for token in lex_tokenizer.tokenize():
-                if token.type in ["mismatch", "mismatch_identifier"]:
-                    raise MismatchedValueError(
-                        f"Token error, input '{token.value}' at position ({token.start+1} to {token.end+1}) with type '{token.type}' at line {self.line_number}!"
-                    )
-
-                if token.type not in ["skip", "comments"]:
-                    self.current_token = self.next_token
-                    self.next_token = token
-                    yield (self.current_token, self.next_token)
+        for token in StreamingLexicalTokenizer(file_path).tokenize():
+            self.line_number = token.line
+            if token.type in ["mismatch", "mismatch_identifier"]:
+                raise MismatchedValueError(
+                    f"Token error, input '{token.value}' with type '{token.type}' at line {token.line}, column {token.column}!"
+                )
 
-            self.line_number += 1
+            if token.type not in ["skip", "comments"]:
+                self.current_token = self.next_token
+                self.next_token = token
+                yield (self.current_token, self.next_token)
 
     def tokenize(self, file_content):
         lexical_tokenizer = LexicalTokenizer(file_content)
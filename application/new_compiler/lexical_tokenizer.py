@@ -1,133 +1,27 @@
-from dataclasses import dataclass
-import re
-
-
-@dataclass
-class LexicToken:
-    type: str
-    value: str = None
-    start: int = 0
-    end: int = 0
-
-
-@dataclass
-class MismatchedValueError(Exception):
-    data: str
-
-
-@dataclass
-class LexicalTokenizer:
-    code: str
-
-    def tokenize(self):
-        keywords = {
-            "int",
-            "var",
-            "class",
-            "let",
-            "return",
-            "class",
-            "void",
-            "function",
-            "while",
-            "do",
-            "static",
-            "boolean",
-            "if",
-            "false",
-            "true",
-            "null",
-            "else",
-            "field",
-            "constructor",
-            "this",
-            "method",
-            "char",
-            "that",
-        }
-
-        symbols = {
-            "\+",
-            "\-",
-            "\*",
-            ";",
-            "<",
-            ">",
-            "=",
-            "\|",
-            "\&",
-            "\,",
-            "\.",
-            ",",
-            "\[",
-            "\]",
-            "\/",
-            "\(",
-            "\)",
-            "{",
-            "}",
-            "'",
-            "~",
-        }
-
-        token_specification = [
-            (
-                "comments",
-                r"//.*|/\*(.|[\r\n])*?\*/",
-            ),  # Gets comments till the end of line
-            ("skip", r"[\s\t\n]+"),  # Skip over spaces and tabs
-            ("keyword", r"|".join(keywords)),
-            ("symbol", r"|".join(symbols)),  # Assignment operator
-            (
-                "mismatch_identifier",
-                r"[0-9]+[a-zA-Z_]+[0-9]*",
-            ),  # Mismatched identifier, starting with a number
-            ("integerConstant", r"\d+"),  # Integer number
-            ("identifier", r"[a-zA-Z_0-9]+"),  # Identifier
-            ("stringConstant", r'"(.*)"'),  # String constant
-            ("mismatch", r"."),  # Any other character
-        ]
-        tok_regex = "|".join(
-            f"(?P<{group_name}>{match})" for group_name, match in token_specification
-        )
-
-        for regex_match in re.finditer(tok_regex, self.code):
-            result = [
-                (k, v) for k, v in regex_match.groupdict().items() if v is not None
-            ][0]
-
-            yield LexicToken(
-                result[0],
-                result[1].replace('"', ""),
-                regex_match.start(0),
-                regex_match.end(0),
-            )
-
-
-def main():
-    statements = """class Point_99 {
-        var     a = 8000; // 1aaasasd
-        var     b = "100";
-        while (a>b) {
-            return 0;
-        }
-    }
-    """
-
-    lex_tokenizer = LexicalTokenizer(statements)
-
-    tokens = []
-
-    for token in lex_tokenizer.tokenize():
-        if token.type in ["mismatch", "mismatch_identifier"]:
-            raise MismatchedValueError(
-                f"Token error, input '{token.value}' at position ({token.start} to {token.end}) with type '{token.type}', check constraints!"
-            )
-        if token.type != "skip":
-            tokens.append(token)
-
-    for token in tokens:
-        print(token)
+import importlib.util
+import os
+import sys
+
+# the Jack lexer is shared with application/compiler, loaded from its file rather than through sys.path,
+# so a "compiler" package elsewhere on the path can never stand in for it
+SHARED_LEXER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "compiler", "lexical_tokenizer.py")
+
+_spec = importlib.util.spec_from_file_location("shared_lexical_tokenizer", SHARED_LEXER_PATH)
+_shared_lexer = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = _shared_lexer  # registered before running it, dataclasses look their module up
+_spec.loader.exec_module(_shared_lexer)
+
+KEYWORDS = _shared_lexer.KEYWORDS
+SYMBOLS = _shared_lexer.SYMBOLS
+TOKEN_SPECIFICATION = _shared_lexer.TOKEN_SPECIFICATION
+TOKEN_REGEX = _shared_lexer.TOKEN_REGEX
+TOKEN_BYTES_REGEX = _shared_lexer.TOKEN_BYTES_REGEX
+MULTILINE_TOKENS = _shared_lexer.MULTILINE_TOKENS
+LexicToken = _shared_lexer.LexicToken
+MismatchedValueError = _shared_lexer.MismatchedValueError
+LexicalTokenizer = _shared_lexer.LexicalTokenizer
+StreamingLexicalTokenizer = _shared_lexer.StreamingLexicalTokenizer
+main = _shared_lexer.main
 
 
 if __name__ == "__main__":
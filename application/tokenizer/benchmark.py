@@ -0,0 +1,155 @@
+from .tokenizer import Tokenizer, tokenize_command
+from .stack import Stack, Pointer
+from .code_cache import CodeCache
+import argparse
+import random
+import time
+import tracemalloc
+
+# sample of commands found on translated Jack programs, with comments and blank lines
+SAMPLE_COMMANDS = [
+    'push constant {n}',
+    'push local {n}',
+    'push argument {n}',
+    'push this {n}',
+    'push that {n}',
+    'push static {n}',
+    'push temp {n}',
+    'push pointer 0',
+    'pop local {n}',
+    'pop argument {n}',
+    'pop this {n}',
+    'pop that {n}',
+    'pop static {n}',
+    'pop temp {n}',
+    'pop pointer 1',
+    'add',
+    'sub',
+    'eq',
+    'gt',
+    'lt',
+    'neg',
+    'and',
+    'or',
+    'not',
+    'label LOOP_{n}',
+    'if-goto LOOP_{n}',
+    'goto END_{n}',
+    'function Main.f{n} {n}',
+    'call Main.f{n} {n}',
+    'return',
+    'push constant {n} // inline comment',
+    '// comment line',
+    '',
+]
+
+'''
+    Generates .vm lines, with fixed seed so both tokenizers read the same corpus
+'''
+def generate_corpus(line_count: int, seed: int = 0) -> list:
+    generator = random.Random(seed)
+    return [generator.choice(SAMPLE_COMMANDS).format(n=generator.randint(0,8)) for _ in range(line_count)]
+
+def tokenize_legacy(lines: list) -> list:
+    return [Tokenizer(file='Main',command=line).token for line in lines]
+
+def tokenize_fast(lines: list) -> list:
+    return [tokenize_command('Main', line) for line in lines]
+
+'''
+    Times tokenizer over lines, best of repeat runs
+    return:
+        tuple -> (tokens, lines per second)
+'''
+def measure(tokenize, lines: list, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = tokenize(lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, len(lines)/best
+
+'''
+    Stack with the same pointers used by application.py
+'''
+def create_stack(code_cache: CodeCache = None) -> Stack:
+    return Stack(
+        file_name   = 'Main',
+        SP          = Pointer(0,256),
+        LCL         = Pointer(1,300),
+        ARG         = Pointer(2,400),
+        THIS        = Pointer(3,3000),
+        THAT        = Pointer(4,3010),
+        TEMP        = Pointer(5,5),
+        POINTER     = Pointer(3,3),
+        CODE_CACHE  = code_cache,
+    )
+
+def generate_by_type(tokens: list) -> list:
+    stack_operation = create_stack()
+    return [line for token in tokens for line in stack_operation.generate_operation_by_type(token)]
+
+def generate_dispatch(tokens: list) -> list:
+    stack_operation = create_stack()
+    return [line for token in tokens for line in stack_operation.generate_operation(token)]
+
+def generate_memoized(tokens: list) -> list:
+    stack_operation = create_stack(CodeCache())
+    return [line for token in tokens for line in stack_operation.generate_operation(token)]
+
+'''
+    Peak traced memory while tokenizing lines, tokens are kept alive like on a full translation
+    return:
+        int -> peak bytes
+'''
+def measure_memory(tokenize, lines: list) -> int:
+    tracemalloc.start()
+    tokens = tokenize(lines)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    arguments_list = [
+        {'name':'--lines','type':int,'default':200000,'help':'number of generated .vm lines'},
+        {'name':'--repeat','type':int,'default':3,'help':'number of timed runs, best one is reported'},
+    ]
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    lines = generate_corpus(args.lines)
+    legacy_tokens, legacy_rate = measure(tokenize_legacy, lines, args.repeat)
+    fast_tokens, fast_rate = measure(tokenize_fast, lines, args.repeat)
+
+    mismatches = sum(1 for legacy, fast in zip(legacy_tokens, fast_tokens) if legacy != fast)
+    print(f'Tokenizer:        {legacy_rate:,.0f} lines/s')
+    print(f'tokenize_command: {fast_rate:,.0f} lines/s ({fast_rate/legacy_rate:.1f}x)')
+    print(f'{mismatches} mismatching tokens on {len(lines)} lines')
+
+    peak = measure_memory(tokenize_fast, lines)
+    print(f'tokenize_command peak memory: {peak/(1<<20):.1f} MB ({peak/len(lines):.0f} bytes/line)')
+
+    tokens = [token for token in fast_tokens if token is not None]
+    by_type_code, by_type_rate = measure(generate_by_type, tokens, args.repeat)
+    dispatch_code, dispatch_rate = measure(generate_dispatch, tokens, args.repeat)
+    memoized_code, memoized_rate = measure(generate_memoized, tokens, args.repeat)
+    instructions = sum(1 for line in dispatch_code if not line.startswith(('//','(')))
+    by_type_rate *= instructions/len(tokens)
+    dispatch_rate *= instructions/len(tokens)
+    memoized_rate *= instructions/len(tokens)
+
+    print(f'generate_operation_by_type:  {by_type_rate:,.0f} instructions/s')
+    print(f'generate_operation:          {dispatch_rate:,.0f} instructions/s ({dispatch_rate/by_type_rate:.1f}x)')
+    print(f'generate_operation memoized: {memoized_rate:,.0f} instructions/s ({memoized_rate/by_type_rate:.1f}x)')
+    print(f"generated code {'matches' if by_type_code == dispatch_code == memoized_code else 'does not match'}, {instructions} instructions")
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,111 @@
+from assembler.assembler import assemble
+from emulator.cpu import HackCPU
+from emulator.emulator import load_program
+from .interpreter import load_path
+from .stack import Stack, Pointer
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# translator entry point, run as a separate process so every flag goes through the same code as the command line
+APPLICATION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),'application.py')
+
+# translator flags checked on every file, shared routines are only placed after the program with compact flags
+FLAG_SETS = [
+    [],
+    ['--compact-comparisons'],
+    ['--compact-calls'],
+    ['--compact-calls','--compact-comparisons'],
+    ['--compact-calls','--compact-comparisons','--batch-pushes','--optimize'],
+]
+
+# same pointers as application.py
+def create_stack() -> Stack:
+    return Stack(
+        file_name   = '',
+        SP          = Pointer(0,256),
+        LCL         = Pointer(1,300),
+        ARG         = Pointer(2,400),
+        THIS        = Pointer(3,3000),
+        THAT        = Pointer(4,3010),
+        TEMP        = Pointer(5,5),
+        POINTER     = Pointer(3,3),
+    )
+
+'''
+    RAM words compared between runs: pointers, temp, statics and the stack up to SP, as unsigned 16 bits values
+'''
+def observed_state(ram) -> list:
+    return [value & 0xFFFF for value in list(ram[0:13]) + list(ram[16:ram[0]])]
+
+'''
+    Runs a single .vm file on VMInterpreter
+    return:
+        list -> observed_state after halting
+'''
+def run_interpreter(file_path: str, max_steps: int) -> list:
+    interpreter, _ = load_path(file_path)
+    interpreter.bootstrap(create_stack(), call_sys_init=False)
+    interpreter.run(max_steps)
+    if not interpreter.halted:
+        raise RuntimeError(f'{file_path} did not halt on VMInterpreter after {max_steps} steps')
+    return observed_state(interpreter.ram)
+
+'''
+    Translates a single .vm file with flags, assembles it and runs it on HackCPU, with pointers set like VMInterpreter.bootstrap
+    return:
+        tuple -> (halted, observed_state)
+'''
+def run_translated(file_path: str, flags: list, max_cycles: int) -> tuple:
+    with tempfile.TemporaryDirectory() as directory:
+        vm_path = os.path.join(directory,os.path.basename(file_path))
+        shutil.copyfile(file_path,vm_path)
+        subprocess.run([sys.executable,APPLICATION_PATH,vm_path]+flags,check=True,stdout=subprocess.DEVNULL)
+        asm_path = f'{os.path.splitext(vm_path)[0]}.asm'
+        assemble(asm_path)
+
+        cpu = HackCPU(load_program(f'{os.path.splitext(vm_path)[0]}.hack'))
+        stack_operation = create_stack()
+        for pointer in [stack_operation.SP, stack_operation.LCL, stack_operation.ARG, stack_operation.THIS, stack_operation.THAT]:
+            cpu.ram[pointer.index] = pointer.memory
+        cpu.run(max_cycles)
+        return cpu.halted, observed_state(cpu.ram)
+
+def main():
+    arguments_list = [
+        {'name':'file_paths','nargs':'+','help':'specifies the single .vm files to be checked, without Sys.init bootstrap'},
+        {'name':'--max-cycles','type':int,'default':10000000,'help':'instructions a translated program may run before it is reported as not halting'},
+    ]
+
+    parser = argparse.ArgumentParser()
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    failures = 0
+    for file_path in args.file_paths:
+        expected = run_interpreter(file_path, args.max_cycles)
+        for flags in FLAG_SETS:
+            halted, state = run_translated(file_path, flags, args.max_cycles)
+            if not halted:
+                result = f'did not halt after {args.max_cycles} cycles'
+            elif state != expected:
+                result = f'mismatch, SP={state[0]} expected SP={expected[0]}'
+            else:
+                result = f'matches VMInterpreter, SP={state[0]}'
+            if not result.startswith('matches'):
+                failures += 1
+            print(f"{file_path} [{' '.join(flags)}]: {result}")
+
+    print(f'{failures} failing runs')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
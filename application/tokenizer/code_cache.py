@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+from .tokenizer import CommandType
+
+# label of code emitted for CODE_CACHE, NUL never being part of a VM symbol
+LABEL_PLACEHOLDER = '\x00LABEL\x00'
+
+'''
+    Emitted assembly cached per VM token, tokens being immutable and keyed by (file, segment, command type, variable)
+    Label-bearing code (comparisons, calls) is emitted with LABEL_PLACEHOLDER as label and kept as a template,
+    the lines holding the placeholder being split around it, so only those lines are rebuilt with the current label
+'''
+@dataclass
+class CodeCache:
+    entries:    dict = field(default_factory=dict)              # token -> (code, label lines, LABEL increment, STATIC increment)
+    hits:       dict = field(default_factory=dict)              # command type -> cache hits
+    misses:     dict = field(default_factory=dict)              # command type -> cache misses
+
+    '''
+        cached entry for token, counting hits / misses
+        return:
+            tuple -> (code, label lines, LABEL increment, STATIC increment), None if token wasn't cached
+    '''
+    def lookup(self, token):
+        entry = self.entries.get(token)
+        if entry is None:
+            self.misses[token.command_type] = self.misses.get(token.command_type, 0) + 1
+        else:
+            self.hits[token.command_type] = self.hits.get(token.command_type, 0) + 1
+        return entry
+
+    '''
+        copy of cached code, with label placed on the label lines
+    '''
+    def render(self, entry: tuple, label: str = None) -> list:
+        code, label_lines, _, _ = entry
+        code = code[:]
+        for index, prefix, suffix in label_lines:
+            code[index] = f'{prefix}{label}{suffix}'
+        return code
+
+    '''
+        caches code emitted for token with LABEL_PLACEHOLDER as label
+        return:
+            tuple -> cached entry, to be rendered with the current label
+    '''
+    def store(self, token, code: list, label_increment: int, static_increment: int) -> tuple:
+        label_lines = [(index, *line.split(LABEL_PLACEHOLDER)) for index, line in enumerate(code) if LABEL_PLACEHOLDER in line]
+        self.entries[token] = (code[:], label_lines, label_increment, static_increment)
+        return self.entries[token]
+
+    '''
+        adds entries and counters of a cache used on other process
+    '''
+    def merge(self, other):
+        self.entries.update(other.entries)
+        for counters, other_counters in [(self.hits, other.hits), (self.misses, other.misses)]:
+            for command_type, count in other_counters.items():
+                counters[command_type] = counters.get(command_type, 0) + count
+
+    def report(self) -> str:
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        report = [f'Code cache: {hits}/{lookups} hits ({hits/lookups*100 if lookups else 0:.1f}%), {len(self.entries)} entries']
+        for command_type in sorted(set(self.hits) | set(self.misses)):
+            command_hits = self.hits.get(command_type, 0)
+            command_lookups = command_hits + self.misses.get(command_type, 0)
+            report.append(f'    {CommandType(command_type).name.lower()}: {command_hits}/{command_lookups} ({command_hits/command_lookups*100:.1f}%)')
+        return '\n'.join(report)
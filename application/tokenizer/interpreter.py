@@ -0,0 +1,358 @@
+from dataclasses import dataclass, field
+from emulator.emulator import parse_ram_range
+from .pipeline import read_lines, tokenize_lines
+from .stack import Stack, Pointer
+from .tokenizer import CommandType, Segment
+import argparse
+import os
+import time
+
+# 16K RAM + screen + keyboard, same as the Hack platform
+RAM_SIZE = 1 << 15
+# first RAM address given to static variables, as the assembler does
+STATIC_START = 16
+
+'''
+    VM operations, push / pop being resolved to their segment when loading
+'''
+VM_PUSH_CONSTANT    = 0
+VM_PUSH_LOCAL       = 1
+VM_PUSH_ARGUMENT    = 2
+VM_PUSH_THIS        = 3
+VM_PUSH_THAT        = 4
+VM_PUSH_ADDRESS     = 5                                         # temp / static, argument being the RAM address
+VM_PUSH_POINTER     = 6                                         # argument 0 -> THIS, 1 -> THAT
+VM_POP_LOCAL        = 7
+VM_POP_ARGUMENT     = 8
+VM_POP_THIS         = 9
+VM_POP_THAT         = 10
+VM_POP_ADDRESS      = 11
+VM_POP_POINTER      = 12
+VM_ADD              = 13
+VM_SUB              = 14
+VM_NEG              = 15
+VM_EQ               = 16
+VM_GT               = 17
+VM_LT               = 18
+VM_AND              = 19
+VM_OR               = 20
+VM_NOT              = 21
+VM_GOTO             = 22                                        # argument is the target index
+VM_IF_GOTO          = 23
+VM_FUNCTION         = 24                                        # argument is the number of locals
+VM_CALL             = 25                                        # argument is (target index, number of arguments)
+VM_RETURN           = 26
+VM_NOP              = 27                                        # "end" commands, kept so indexes match the tokens
+
+# (command type, segment) -> push / pop operation, segments addressed by pointer registers
+SEGMENT_OPERATIONS = {
+    (CommandType.PUSH, Segment.CONSTANT):   VM_PUSH_CONSTANT,
+    (CommandType.PUSH, Segment.LCL):        VM_PUSH_LOCAL,
+    (CommandType.PUSH, Segment.ARG):        VM_PUSH_ARGUMENT,
+    (CommandType.PUSH, Segment.THIS):       VM_PUSH_THIS,
+    (CommandType.PUSH, Segment.THAT):       VM_PUSH_THAT,
+    (CommandType.PUSH, Segment.POINTER):    VM_PUSH_POINTER,
+    (CommandType.POP, Segment.LCL):         VM_POP_LOCAL,
+    (CommandType.POP, Segment.ARG):         VM_POP_ARGUMENT,
+    (CommandType.POP, Segment.THIS):        VM_POP_THIS,
+    (CommandType.POP, Segment.THAT):        VM_POP_THAT,
+    (CommandType.POP, Segment.POINTER):     VM_POP_POINTER,
+}
+
+# command type -> operation without argument
+COMMAND_OPERATIONS = {
+    CommandType.ADD:    VM_ADD,
+    CommandType.SUB:    VM_SUB,
+    CommandType.NEG:    VM_NEG,
+    CommandType.EQ:     VM_EQ,
+    CommandType.GT:     VM_GT,
+    CommandType.LT:     VM_LT,
+    CommandType.AND:    VM_AND,
+    CommandType.OR:     VM_OR,
+    CommandType.NOT:    VM_NOT,
+    CommandType.RETURN: VM_RETURN,
+    CommandType.END:    VM_NOP,
+}
+
+class UnresolvedSymbol(Exception):
+    pass
+
+'''
+    Resolves tokens into (operation, argument) tuples
+    labels are dropped, goto / if-goto / call targets becoming indexes of the loaded program
+    labels are looked up on the function they were declared first, then on every function, since translated code shares a single label namespace
+    static variables get RAM addresses from STATIC_START on first use, matching the assembler variable allocation
+    return:
+        tuple -> (program, function name -> index)
+'''
+def load_tokens(tokens) -> tuple:
+    commands = []
+    labels = {}                                                 # (function, label) -> index
+    global_labels = {}                                          # label -> index
+    functions = {}
+    statics = {}
+    function_name = None
+
+    for token in tokens:
+        command_type = token.command_type
+        if command_type == CommandType.LABEL:
+            labels[(function_name, token.variable)] = len(commands)
+            global_labels.setdefault(token.variable, len(commands))
+            continue
+        if command_type == CommandType.FUNCTION:
+            function_name = token.segment_pointer
+            functions[function_name] = len(commands)
+        commands.append((token, function_name))
+
+    def resolve_label(label, function_name):
+        index = labels.get((function_name, label), global_labels.get(label))
+        if index is None:
+            raise UnresolvedSymbol(f'label {label} not found, used on {function_name}')
+        return index
+
+    program = []
+    for token, function_name in commands:
+        command_type = token.command_type
+        if command_type in (CommandType.PUSH, CommandType.POP):
+            segment = token.segment_pointer
+            if segment == Segment.TEMP:
+                program.append((VM_PUSH_ADDRESS if command_type == CommandType.PUSH else VM_POP_ADDRESS, 5 + int(token.variable)))
+            elif segment == Segment.STATIC:
+                address = statics.setdefault((token.file, token.variable), STATIC_START + len(statics))
+                program.append((VM_PUSH_ADDRESS if command_type == CommandType.PUSH else VM_POP_ADDRESS, address))
+            else:
+                program.append((SEGMENT_OPERATIONS[(command_type, segment)], int(token.variable)))
+        elif command_type == CommandType.GOTO:
+            program.append((VM_GOTO, resolve_label(token.variable, function_name)))
+        elif command_type == CommandType.IF_GOTO:
+            program.append((VM_IF_GOTO, resolve_label(token.variable, function_name)))
+        elif command_type == CommandType.FUNCTION:
+            program.append((VM_FUNCTION, int(token.variable)))
+        elif command_type == CommandType.CALL:
+            if token.segment_pointer not in functions:
+                raise UnresolvedSymbol(f'function {token.segment_pointer} not found, called on {function_name}')
+            program.append((VM_CALL, (functions[token.segment_pointer], int(token.variable))))
+        else:
+            program.append((COMMAND_OPERATIONS[command_type], None))
+
+    return program, functions
+
+'''
+    Executes loaded VM programs directly, pointers being python locals while running and RAM[0..4] otherwise
+    call / return keep frames as python tuples, still reserving the 5 frame words on the stack so SP / LCL / ARG
+    and the stack contents match the translated code, the return address word holding the program index
+    arithmetic follows the translated code: 16-bit wrapping, comparisons on the wrapped difference, if-goto jumping on negative values
+    halts when execution leaves the program, returns from the outermost frame or reaches a "label X / goto X" loop
+'''
+@dataclass
+class VMInterpreter:
+    program:    list                                            # load_tokens output
+    functions:  dict
+    ram:        list = field(default_factory=lambda: [0] * RAM_SIZE)
+    frames:     list = field(default_factory=list)              # (return index, LCL, ARG, THIS, THAT)
+    PC:         int = 0
+    steps:      int = 0
+    halted:     bool = False
+
+    '''
+        same pointer values as Stack.create_bootstrap_statment, calling Sys.init when call_sys_init is set
+    '''
+    def bootstrap(self, stack_operation, call_sys_init: bool = True):
+        ram = self.ram
+        for pointer in [stack_operation.SP, stack_operation.LCL, stack_operation.ARG, stack_operation.THIS, stack_operation.THAT]:
+            ram[pointer.index] = pointer.memory
+        self.PC = 0
+        if not call_sys_init:
+            return
+        if 'Sys.init' not in self.functions:
+            raise UnresolvedSymbol('function Sys.init not found')
+        sp = ram[0]
+        frame = (len(self.program), ram[1], ram[2], ram[3], ram[4])
+        ram[sp:sp+5] = frame
+        self.frames.append(frame)
+        ram[0] = ram[1] = sp + 5
+        ram[2] = sp
+        self.PC = self.functions['Sys.init']
+
+    '''
+        runs until halt or max_steps VM commands were executed
+        return:
+            int -> number of VM commands executed by this call
+    '''
+    def run(self, max_steps: int = None) -> int:
+        program = self.program
+        ram = self.ram
+        frames = self.frames
+        sp, lcl, arg, this, that = ram[0:5]
+        pc = self.PC
+        program_size = len(program)
+        start_steps = steps = self.steps
+        step_limit = steps + max_steps if max_steps is not None else float('inf')
+        halted = False
+
+        while steps < step_limit:
+            if pc >= program_size:
+                halted = True
+                break
+            operation, argument = program[pc]
+            steps += 1
+            pc += 1
+
+            # most frequent operations on compiled Jack code first
+            if operation == VM_PUSH_CONSTANT:
+                ram[sp] = argument
+                sp += 1
+            elif operation == VM_PUSH_LOCAL:
+                ram[sp] = ram[lcl + argument]
+                sp += 1
+            elif operation == VM_PUSH_ARGUMENT:
+                ram[sp] = ram[arg + argument]
+                sp += 1
+            elif operation == VM_POP_LOCAL:
+                sp -= 1
+                ram[lcl + argument] = ram[sp]
+            elif operation == VM_ADD:
+                sp -= 1
+                x = ram[sp-1] + ram[sp]
+                ram[sp-1] = ((x + 32768) & 0xFFFF) - 32768
+            elif operation == VM_SUB:
+                sp -= 1
+                x = ram[sp-1] - ram[sp]
+                ram[sp-1] = ((x + 32768) & 0xFFFF) - 32768
+            elif operation == VM_IF_GOTO:
+                sp -= 1
+                if ram[sp] < 0:
+                    pc = argument
+            elif operation == VM_GOTO:
+                if argument == pc - 1:                          # "label X / goto X"
+                    halted = True
+                    pc = argument
+                    break
+                pc = argument
+            elif operation == VM_PUSH_ADDRESS:
+                ram[sp] = ram[argument]
+                sp += 1
+            elif operation == VM_POP_ADDRESS:
+                sp -= 1
+                ram[argument] = ram[sp]
+            elif operation == VM_PUSH_THIS:
+                ram[sp] = ram[this + argument]
+                sp += 1
+            elif operation == VM_PUSH_THAT:
+                ram[sp] = ram[that + argument]
+                sp += 1
+            elif operation == VM_POP_THIS:
+                sp -= 1
+                ram[this + argument] = ram[sp]
+            elif operation == VM_POP_THAT:
+                sp -= 1
+                ram[that + argument] = ram[sp]
+            elif operation == VM_POP_ARGUMENT:
+                sp -= 1
+                ram[arg + argument] = ram[sp]
+            elif operation == VM_PUSH_POINTER:
+                ram[sp] = that if argument else this
+                sp += 1
+            elif operation == VM_POP_POINTER:
+                sp -= 1
+                if argument:
+                    that = ram[sp]
+                else:
+                    this = ram[sp]
+            elif operation in (VM_EQ, VM_GT, VM_LT):
+                sp -= 1
+                x = ((ram[sp-1] - ram[sp] + 32768) & 0xFFFF) - 32768
+                ram[sp-1] = -1 if (x == 0 if operation == VM_EQ else x > 0 if operation == VM_GT else x < 0) else 0
+            elif operation == VM_NOT:
+                ram[sp-1] = ~ram[sp-1]
+            elif operation == VM_NEG:
+                ram[sp-1] = ((32768 - ram[sp-1]) & 0xFFFF) - 32768
+            elif operation == VM_AND:
+                sp -= 1
+                ram[sp-1] &= ram[sp]
+            elif operation == VM_OR:
+                sp -= 1
+                ram[sp-1] |= ram[sp]
+            elif operation == VM_CALL:
+                target, arguments = argument
+                frame = (pc, lcl, arg, this, that)
+                ram[sp:sp+5] = frame
+                frames.append(frame)
+                sp += 5
+                arg = sp - 5 - arguments
+                lcl = sp
+                pc = target
+            elif operation == VM_FUNCTION:
+                ram[sp:sp+argument] = [0] * argument
+                sp += argument
+            elif operation == VM_RETURN:
+                ram[arg] = ram[sp-1]
+                sp = arg + 1
+                if not frames:
+                    halted = True
+                    break
+                pc, lcl, arg, this, that = frames.pop()
+
+        ram[0:5] = sp, lcl, arg, this, that
+        self.PC, self.steps = pc, steps
+        self.halted = halted or pc >= program_size
+        return steps - start_steps
+
+'''
+    Loads .vm file / directory, files being read in the same order as application.py
+    return:
+        tuple -> (VMInterpreter, True if bootstrap code applies)
+'''
+def load_path(file_path: str) -> tuple:
+    if os.path.isdir(file_path):
+        files = [
+            (file.split('.')[0], f'{file_path}/{file}')
+            for file in sorted(os.listdir(file_path)) if file.endswith('.vm')
+        ]
+    else:
+        files = [(os.path.splitext(os.path.split(file_path)[1])[0], file_path)]
+    program, functions = load_tokens(tokenize_lines(read_lines(files)))
+    return VMInterpreter(program, functions), os.path.isdir(file_path)
+
+def main():
+    arguments_list = [
+        {'name':'file_path','type':str,'help':'specifies the .vm file / directory to be run, directories being bootstrapped by calling Sys.init'},
+        {'name':'--max-steps','type':int,'default':None,'help':'stops after executing this number of VM commands'},
+        {'name':'--ram','type':parse_ram_range,'action':'append','default':[],'help':'prints RAM addresses after running, as <address> or <start>:<end>'},
+    ]
+
+    parser = argparse.ArgumentParser()
+
+    for arg in arguments_list:
+        parser.add_argument(
+            arg.pop('name'),**arg
+        )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    interpreter, bootstrap = load_path(args.file_path)
+    # same pointers as application.py
+    stack_operation = Stack(
+        file_name   = '',
+        SP          = Pointer(0,256),
+        LCL         = Pointer(1,300),
+        ARG         = Pointer(2,400),
+        THIS        = Pointer(3,3000),
+        THAT        = Pointer(4,3010),
+        TEMP        = Pointer(5,5),
+        POINTER     = Pointer(3,3),
+    )
+    interpreter.bootstrap(stack_operation, call_sys_init=bootstrap)
+    loaded = time.perf_counter()
+    interpreter.run(args.max_steps)
+    elapsed = time.perf_counter() - loaded
+
+    print(f"{'Halted' if interpreter.halted else 'Stopped'} at command {interpreter.PC} after {interpreter.steps} steps")
+    print(f'Loaded in {loaded-start:.3f}s, ran in {elapsed:.3f}s ({interpreter.steps/elapsed if elapsed else 0:,.0f} commands/s)')
+    for ram_range in args.ram:
+        for address in ram_range:
+            print(f'RAM[{address}] = {interpreter.ram[address]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+from dataclasses import dataclass, field
+import re
+
+@dataclass
+class PeepholeRule:
+    name:           str
+    pattern:        list                                    # assembly lines, "{NAME}" matches any text and must be equal on every line it appears
+    replacement:    list                                    # assembly lines, "{NAME}" replaced by matched text
+    dead_registers: bool = False                            # replacement leaves A-Reg different, only valid when next instruction reloads A
+
+    def __post_init__(self):
+        self.compiled_pattern = [
+            re.compile(re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>.+?)', re.escape(line))) if '{' in line else line
+            for line in self.pattern
+        ]
+
+    '''
+        Matches rule at index of instructions
+        return:
+            dict -> captured placeholders, None if rule doesn't match
+    '''
+    def match(self, instructions: list, index: int):
+        if index + len(self.pattern) > len(instructions):
+            return None
+
+        captures = {}
+        for offset, line in enumerate(self.compiled_pattern):
+            instruction = instructions[index+offset]
+            if isinstance(line, str):
+                if instruction != line:
+                    return None
+                continue
+            regex_match = line.fullmatch(instruction)
+            if regex_match is None:
+                return None
+            for key, value in regex_match.groupdict().items():
+                if captures.setdefault(key, value) != value:
+                    return None
+
+        # A-Reg must be reloaded (or be unknown because of a label) after the window
+        if self.dead_registers:
+            next_index = index + len(self.pattern)
+            if next_index < len(instructions) and instructions[next_index][0] not in '@(':
+                return None
+
+        return captures
+
+'''
+    Rules are written for the sequences generated by Stack, using {SP} as the stack pointer address.
+    Every rule ends where the VM command it rewrites ends, so values left above *SP are never read again.
+    Rules fusing a push with a pop own R13 / R14, since call / return (inlined or shared) never pop right after a push.
+    Rules are tried in order, fusions first since they start on the same push sequence.
+'''
+PEEPHOLE_RULES = [
+    # push <any>; pop static / pointer -> store D directly
+    PeepholeRule(
+        'push_pop_direct',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1','@{SP}','A=M-1','D=M','@{X}','M=D','@{SP}','M=M-1'],
+        ['@{X}','M=D'],
+        dead_registers=True
+    ),
+    # push <any>; pop local / argument / this / that / temp -> store D through R13 / R14
+    PeepholeRule(
+        'push_pop_segment',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1','@{OFFSET}','D=A','@{BASE}','D=D+{R}','@{SP}','A=M','M=D','A=A-1','D=M','@{SP}','A=M','A=M','M=D','@{SP}','M=M-1'],
+        ['@13','M=D','@{OFFSET}','D=A','@{BASE}','D=D+{R}','@14','M=D','@13','D=M','@14','A=M','M=D'],
+        dead_registers=True
+    ),
+    # push <any>; add / sub -> operate on D
+    PeepholeRule(
+        'push_arithmetic',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1','@{SP}','A=M-1','D=M','A=A-1','M=M{OP}D','@{SP}','M=M-1'],
+        ['@{SP}','A=M-1','M=M{OP}D'],
+        dead_registers=True
+    ),
+    # push <any>; eq / gt / lt -> compare with D
+    PeepholeRule(
+        'push_comparison',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1','@{SP}','A=M-1','D=M','@{SP}','M=M-1','@{SP}','A=M-1','D=M-D'],
+        ['@{SP}','A=M-1','D=M-D']
+    ),
+    # push <any>; if-goto -> jump on D
+    PeepholeRule(
+        'push_if_goto',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1','@{SP}','A=M-1','D=M','@{SP}','M=M-1','@{LABEL}','D;JLT'],
+        ['@{LABEL}','D;JLT']
+    ),
+    # push <any>; SP-- -> SP increment and decrement cancel out
+    PeepholeRule(
+        'push_sp_cancel',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1','@{SP}','M=M-1'],
+        ['@{SP}','A=M','M=D']
+    ),
+    # SP++; SP-- -> SP increment and decrement cancel out
+    PeepholeRule(
+        'sp_cancel',
+        ['@{SP}','M=M+1','@{SP}','M=M-1'],
+        ['@{SP}']
+    ),
+    # *SP = D; D = *SP -> D already holds the value
+    PeepholeRule(
+        'store_load',
+        ['@{SP}','A=M','M=D','@{SP}','A=M','D=M'],
+        ['@{SP}','A=M','M=D']
+    ),
+    # pop local / argument / this / that / temp -> keep address in R15 instead of RAM[*SP], R13 / R14 are in use on return
+    PeepholeRule(
+        'pop_segment',
+        ['@{OFFSET}','D=A','@{BASE}','D=D+{R}','@{SP}','A=M','M=D','A=A-1','D=M','@{SP}','A=M','A=M','M=D','@{SP}','M=M-1'],
+        ['@{OFFSET}','D=A','@{BASE}','D=D+{R}','@15','M=D','@{SP}','AM=M-1','D=M','@15','A=M','M=D'],
+        dead_registers=True
+    ),
+    # pop static / pointer -> decrement SP while reading the value
+    PeepholeRule(
+        'pop_direct',
+        ['@{SP}','A=M-1','D=M','@{X}','M=D','@{SP}','M=M-1'],
+        ['@{SP}','AM=M-1','D=M','@{X}','M=D'],
+        dead_registers=True
+    ),
+    # push <any> -> increment SP before storing
+    PeepholeRule(
+        'push',
+        ['@{SP}','A=M','M=D','@{SP}','M=M+1'],
+        ['@{SP}','M=M+1','A=M-1','M=D'],
+        dead_registers=True
+    ),
+]
+
+'''
+    Optimizes generated Hack assembly between Stack.generate_operation and the .asm write.
+    Comments are dropped, since they don't take ROM space.
+'''
+@dataclass
+class PeepholeOptimizer:
+    stack_pointer:          str = '0'                                           # SP address, as written by Stack
+    rules:                  list = field(default_factory=lambda: PEEPHOLE_RULES)
+    instructions_before:    int = 0
+    instructions_after:     int = 0
+    rule_count:             dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        # replaces {SP} by the stack pointer address, so most rules start with a literal line
+        self.rules = [
+            PeepholeRule(
+                rule.name,
+                [line.replace('{SP}',self.stack_pointer) for line in rule.pattern],
+                [line.replace('{SP}',self.stack_pointer) for line in rule.replacement],
+                rule.dead_registers
+            )
+            for rule in self.rules
+        ]
+        self.candidate_rules = {}
+
+    '''
+        rules that may start on instruction, keeping priority order
+    '''
+    def get_candidate_rules(self, instruction: str) -> list:
+        if instruction not in self.candidate_rules:
+            self.candidate_rules[instruction] = [
+                rule for rule in self.rules
+                if (rule.compiled_pattern[0] == instruction if isinstance(rule.compiled_pattern[0], str) else rule.compiled_pattern[0].fullmatch(instruction))
+            ]
+        return self.candidate_rules[instruction]
+
+    '''
+        applies rules once over instructions
+    '''
+    def apply_rules(self, instructions: list) -> list:
+        optimized_code = []
+        index = 0
+        while index < len(instructions):
+            for rule in self.get_candidate_rules(instructions[index]):
+                captures = rule.match(instructions, index)
+                if captures is not None:
+                    optimized_code += [line.format(**captures) for line in rule.replacement]
+                    self.rule_count[rule.name] = self.rule_count.get(rule.name, 0) + 1
+                    index += len(rule.pattern)
+                    break
+            else:
+                optimized_code.append(instructions[index])
+                index += 1
+
+        return optimized_code
+
+    '''
+        drops @X loads when A-Reg already holds X, or when A-Reg is loaded again before being used
+    '''
+    def remove_dead_loads(self, instructions: list) -> list:
+        optimized_code = []
+        known_address = None
+        for index, instruction in enumerate(instructions):
+            if instruction.startswith('('):                                     # label can be reached from jumps, A-Reg is unknown
+                known_address = None
+            elif instruction.startswith('@'):
+                if instruction == known_address or (index+1 < len(instructions) and instructions[index+1].startswith('@')):
+                    self.rule_count['dead_load'] = self.rule_count.get('dead_load', 0) + 1
+                    continue
+                known_address = instruction
+            elif 'A' in instruction.split('=')[0] and '=' in instruction:       # A-Reg is destination
+                known_address = None
+            optimized_code.append(instruction)
+
+        return optimized_code
+
+    def count_instructions(self, code: list) -> int:
+        return sum(1 for line in code if line and not line.startswith(('//','(')))
+
+    def optimize(self, code: list) -> list:
+        instructions = [line for line in code if line and not line.startswith('//')]
+        self.instructions_before += self.count_instructions(instructions)
+
+        optimized_code = None
+        while optimized_code != instructions:
+            optimized_code = instructions
+            instructions = self.remove_dead_loads(self.apply_rules(instructions))
+
+        self.instructions_after += self.count_instructions(instructions)
+        return instructions
+
+    def report(self) -> str:
+        saved = self.instructions_before - self.instructions_after
+        report = [
+            f'Peephole optimizer: {self.instructions_before} -> {self.instructions_after} instructions, '
+            f'{saved} saved ({saved/self.instructions_before*100 if self.instructions_before else 0:.1f}%)'
+        ]
+        report += [f'    {name}: {count}' for name, count in sorted(self.rule_count.items())]
+        return '\n'.join(report)
@@ -0,0 +1,192 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from .tokenizer import tokenize_command
+import time
+
+# write buffer size for streamed .asm output
+WRITE_BUFFER_SIZE = 1 << 20
+
+'''
+    Per-stage timing counters for the translation pipeline
+    stages are chained generators, so each stage time excludes the time spent on the stages feeding it
+'''
+@dataclass
+class StageTimer:
+    stages:     dict = field(default_factory=dict)              # stage name -> [seconds including previous stages, items]
+
+    '''
+        wraps iterable, adding to the stage counter the time spent to produce each item
+        stages are registered when wrapped, keeping the pipeline order on report
+    '''
+    def timed(self, name: str, iterable):
+        return self.time_items(self.stages.setdefault(name, [0.0, 0]), iter(iterable))
+
+    def time_items(self, counter: list, iterator):
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                counter[0] += time.perf_counter() - start
+                return
+            counter[0] += time.perf_counter() - start
+            counter[1] += 1
+            yield item
+
+    def report(self, total: float) -> str:
+        report = []
+        previous = 0.0
+        for name, (elapsed, items) in self.stages.items():
+            report.append(f'    {name}: {elapsed-previous:.3f}s, {items} items')
+            previous = elapsed
+        report.append(f'    write: {total-previous:.3f}s')
+        return '\n'.join([f'Translated in {total:.3f}s'] + report)
+
+'''
+    Reads .vm files line by line
+    return:
+        generator of (file name, line), file name being used for STATIC segment
+'''
+def read_lines(files: list):
+    for file_name, file_path in files:
+        with open(file_path,'r') as input_fp:
+            for line in input_fp:
+                yield file_name, line.strip()
+
+'''
+    Reads .vm files line by line, with line numbers starting at 1
+    return:
+        generator of (file name, line number, line)
+'''
+def read_numbered_lines(files: list):
+    for file_name, file_path in files:
+        with open(file_path,'r') as input_fp:
+            for line_number, line in enumerate(input_fp, 1):
+                yield file_name, line_number, line.strip()
+
+'''
+    Tokenizes lines, skipping comments and empty lines
+'''
+def tokenize_lines(lines):
+    for file_name, line in lines:
+        token = tokenize_command(file_name, line)
+        if token is not None:
+            yield token
+
+'''
+    Tokenizes numbered lines, skipping comments and empty lines
+    return:
+        generator of (line number, token)
+'''
+def tokenize_numbered_lines(lines):
+    for file_name, line_number, line in lines:
+        token = tokenize_command(file_name, line)
+        if token is not None:
+            yield line_number, token
+
+'''
+    Generates assembly lines for each token, flushing pending batched pushes after the last one
+'''
+def generate_code(stack_operation, tokens):
+    for token in tokens:
+        yield from stack_operation.generate_operation(token)
+    yield from stack_operation.flush_pending_pushes()
+
+'''
+    Generates assembly lines for each numbered token, with source markers
+'''
+def generate_mapped_code(stack_operation, numbered_tokens):
+    for line_number, token in numbered_tokens:
+        yield from stack_operation.generate_mapped_operation(token, line_number)
+    yield from stack_operation.flush_pending_pushes()
+
+'''
+    Runs the stages translating a single file, with source markers when source_map is set, timed when timer is passed
+'''
+def translate_stages(stack_operation, file_name: str, file_path: str, timer: StageTimer = None, source_map: bool = False):
+    files = [(file_name, file_path)]
+    lines = read_numbered_lines(files) if source_map else read_lines(files)
+    if timer is not None:
+        lines = timer.timed('read', lines)
+    tokens = tokenize_numbered_lines(lines) if source_map else tokenize_lines(lines)
+    if timer is not None:
+        tokens = timer.timed('tokenize', tokens)
+    code = generate_mapped_code(stack_operation, tokens) if source_map else generate_code(stack_operation, tokens)
+    if timer is not None:
+        code = timer.timed('generate', code)
+    return code
+
+'''
+    Copy of stack_operation for a single file, with its own label counter scoped by the file name,
+    so the generated code doesn't depend on which files were translated before it
+'''
+def create_file_stack(stack_operation, file_name: str):
+    return replace(
+        stack_operation,
+        LABEL=0,
+        LABEL_NAMESPACE=file_name,
+        FUNCTION_LABELS=[],
+        FUNCTION_DEFINITION={},
+        PENDING_PUSHES=[],
+        SOURCE_FUNCTION=None
+    )
+
+'''
+    Translates a single .vm file on a worker process
+    return:
+        tuple -> (assembly lines of the file, code cache of the worker or None)
+'''
+def translate_file(stack_operation, file_name: str, file_path: str, source_map: bool = False) -> tuple:
+    file_stack = create_file_stack(stack_operation, file_name)
+    return list(translate_stages(file_stack, file_name, file_path, source_map=source_map)), file_stack.CODE_CACHE
+
+'''
+    Translates files on a process pool, one file per worker, yielding their code in the order of files
+    code cache counters of the workers are added to the code cache of stack_operation
+'''
+def translate_parallel(stack_operation, files: list, jobs: int = None, source_map: bool = False):
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for file_code, code_cache in executor.map(
+            translate_file,
+            [stack_operation]*len(files),
+            [file_name for file_name, _ in files],
+            [file_path for _, file_path in files],
+            [source_map]*len(files)
+        ):
+            if code_cache is not None:
+                stack_operation.CODE_CACHE.merge(code_cache)
+            yield from file_code
+
+'''
+    Translates .vm files to assembly lines, wrapped by the timer stages when timer is passed
+        prologue: bootstrap / shared routines placed before the translated code
+        epilogue: shared routines placed after the translated code
+        jobs: number of worker processes, 1 streams files one after another on the current process
+        source_map: writes source markers before the code of each VM command, see assembler.source_map
+'''
+def translate(stack_operation, files: list, prologue: list = None, epilogue: list = None, timer: StageTimer = None, jobs: int = 1, source_map: bool = False):
+    yield from prologue or []
+
+    if jobs != 1:
+        code = translate_parallel(stack_operation, files, jobs, source_map)
+        if timer is not None:
+            code = timer.timed('translate', code)
+        yield from code
+    else:
+        for file_name, file_path in files:
+            yield from translate_stages(create_file_stack(stack_operation, file_name), file_name, file_path, timer, source_map)
+
+    yield from epilogue or []
+
+'''
+    Writes assembly lines to buffered output, separated by new lines
+    return:
+        int -> number of lines written
+'''
+def write_code(output_path: str, code) -> int:
+    line_count = 0
+    with open(output_path,'w',buffering=WRITE_BUFFER_SIZE) as output_fp:
+        for line in code:
+            output_fp.write(f'\n{line}' if line_count else line)
+            line_count += 1
+    return line_count
@@ -1,8 +1,13 @@
 from dataclasses import dataclass, field
-from .tokenizer import Token, Tokenizer
+from .tokenizer import Token, Tokenizer, CommandType, Segment
+from .code_cache import CodeCache, LABEL_PLACEHOLDER
+from assembler.source_map import SourceOrigin, create_source_marker
 import argparse
 import os
 
+# commands emitted without CODE_CACHE, see Stack.emit_cached_operation
+UNCACHED_COMMANDS = frozenset([CommandType.LABEL, CommandType.IF_GOTO, CommandType.GOTO, CommandType.FUNCTION, CommandType.END])
+
 @dataclass
 class Pointer():
     index:  int
@@ -20,8 +25,81 @@ class Stack():
     POINTER:                Pointer                              # push / pop 0 / 1 should provide THIS / THAT respectively: PUSH -> *SP = THIS / THAT; SP++; POP -> SP--; *SP=THIS/THAT
     STATIC:                 int = 0                              # start position of created variable
     LABEL:                  int = 0                              # integer for label naming purposes
+    LABEL_NAMESPACE:        str = None                           # prefix for generated labels, so files translated apart don't share label names
     FUNCTION_LABELS:        list = field(default_factory=list)   # list that contains function labels for return statement, LIFO on list to get current return statment needs
     FUNCTION_DEFINITION:    dict = field(default_factory=dict)   # defines dict with tuple of (function name, function local variable)
+    COMPACT_CALLS:          bool = False                         # call / return jump to shared frame save / restore routines instead of inlining them
+    COMPACT_COMPARISONS:    bool = False                         # eq / gt / lt jump to shared comparison routines instead of inlining them
+    BATCH_PUSHES:           bool = False                         # consecutive push constant and function locals are written with a single SP update
+    LOCALS_UNROLL_LIMIT:    int = 4                              # functions with more local variables zero them with a loop instead of unrolled code
+    PENDING_PUSHES:         list = field(default_factory=list)   # push constant tokens waiting to be written as a batch
+    CODE_CACHE:             CodeCache = None                     # memoizes emitted code per token when set, shared by copies of the Stack
+    SOURCE_FUNCTION:        str = None                           # function of the last function command, for source markers
+    EMITTING_TEMPLATE:      bool = False                         # get_label returns LABEL_PLACEHOLDER while code for CODE_CACHE is emitted
+
+    def __post_init__(self):
+        self.create_templates()
+        self.create_dispatch_table()
+
+    '''
+        prebuilds the code of every command, as the lines around the token dependent ones, keyed by (command_type, segment)
+        templates must only be copied, never returned or extended in place
+    '''
+    def create_templates(self):
+        stack_pointer   = self.SP.index
+        increment_sp    = self.update_sp_code(1)
+        decrement_sp    = self.update_sp_code(0)
+        self.templates  = {}
+
+        # push / pop on offseted segments: comment, @<variable>, template
+        for segment in [Segment.LCL, Segment.ARG, Segment.THIS, Segment.THAT, Segment.TEMP]:
+            attribute = getattr(self,segment)
+            offset_code = [
+                'D=A',
+                f'@{attribute.index}',
+                f"D=D+{'M' if segment != Segment.TEMP else 'A'}",
+                '@0',
+                'A=M',
+                'M=D',
+            ]
+            comment = f'// Calculates offset from virtual memory space getting RAM[*SP]={attribute.memory}+'
+            self.templates[(CommandType.PUSH, segment)] = (comment, offset_code + [
+                '// Get value from stack by accessing virtual segment offseted value',
+                'A=D',
+                'D=M',
+                f'@{stack_pointer}',
+                'A=M',
+                'M=D'
+            ] + increment_sp)
+            self.templates[(CommandType.POP, segment)] = (comment, offset_code + [
+                'A=A-1',
+                'D=M',
+                f'@{stack_pointer}',
+                'A=M',
+                'A=M',
+                'M=D'
+            ] + decrement_sp)
+
+        self.templates[(CommandType.PUSH, Segment.CONSTANT)] = ['D=A', f'@{stack_pointer}', 'A=M', 'M=D'] + increment_sp
+        self.templates[(CommandType.PUSH, Segment.STATIC)] = ['D=M', f'@{stack_pointer}', 'A=M', 'M=D'] + increment_sp
+        self.templates[(CommandType.POP, Segment.STATIC)] = ['M=D'] + decrement_sp
+
+        # push / pop pointer only accept 0 (THIS) / 1 (THAT), so the whole code is prebuilt
+        for command_type, create_code in [(CommandType.PUSH, self.push_to_segement), (CommandType.POP, self.pop_from_stack)]:
+            self.templates[(command_type, Segment.POINTER)] = {
+                variable: create_code(Token(segment_pointer=Segment.POINTER, command_type=command_type, variable=variable))
+                for variable in ['0','1']
+            }
+
+        for command_type in [CommandType.ADD, CommandType.SUB]:
+            self.templates[(command_type, None)] = self.create_addition_or_subtraction_statement(Token(command_type=command_type)) + decrement_sp
+        for command_type in [CommandType.NEG, CommandType.NOT]:
+            self.templates[(command_type, None)] = self.create_negate_not_statement(Token(command_type=command_type))
+        for command_type in [CommandType.AND, CommandType.OR]:
+            self.templates[(command_type, None)] = self.create_and_or_statement(Token(command_type=command_type))
+
+        self.templates[(CommandType.IF_GOTO, None)] = self.create_if_goto_statement(Token(command_type=CommandType.IF_GOTO, variable=''))[:-2]
+        self.templates[(CommandType.RETURN, None)] = self.create_return_statement(Token(command_type=CommandType.RETURN))
 
     '''
         generates code for incrementing / decrementing Stack Pointer (SP)
@@ -41,6 +119,34 @@ class Stack():
             f"M=M{type_def[operation]['symbol']}1"       # code for setting the memory address the - / + 1
         ]
 
+    '''
+        name suffix for generated labels, scoped by LABEL_NAMESPACE when set
+    '''
+    def get_label(self) -> str:
+        if self.EMITTING_TEMPLATE:
+            return LABEL_PLACEHOLDER
+        if self.LABEL_NAMESPACE is None:
+            return str(self.LABEL)
+        return f'{self.LABEL_NAMESPACE}.{self.LABEL}'
+
+    '''
+        generates code for incrementing Stack Pointer (SP) by count
+    '''
+    def update_sp_code_by(self, count: int):
+        if count <= 2:
+            return [
+                f'// Updates Stack Pointer by incrementing it by {count}',
+                f"@{self.SP.index}",                        # code for selecting @SP
+            ] + ['M=M+1'] * count                           # code for setting the memory address + 1, count times
+
+        return [
+            f'// Updates Stack Pointer by incrementing it by {count}',
+            f"@{count}",                                    # A=count
+            'D=A',                                          # D=count
+            f"@{self.SP.index}",                            # code for selecting @SP
+            'M=M+D'                                         # SP=SP+count
+        ]
+
     '''
         Calculates offset based on variable value of Token passed
     '''
@@ -130,6 +236,53 @@ class Stack():
         
         return final_code
 
+    '''
+        push several constants to stack, writing RAM[*SP+offset] for each one and updating SP once
+        0 / 1 constants are written directly when A-Reg already points to the stack
+    '''
+    def create_push_constants_statement(self, values: list) -> list:
+        stack_pointer   = getattr(self,'SP').index
+        final_code      = [f'// Push {len(values)} constants to stack, RAM[*{stack_pointer}..*{stack_pointer}+{len(values)-1}]']
+        address_offset  = None                                  # stack offset A-Reg is pointing to, None when A-Reg holds other value
+
+        for offset, value in enumerate(values):
+            if value in ['0','1']:
+                if address_offset is None:
+                    final_code += [
+                        f'@{stack_pointer}',                    # A=SP
+                        'A=M'                                   # A=*SP
+                    ]
+                    address_offset = 0
+                final_code += ['A=A+1'] * (offset - address_offset)   # A=*SP+offset
+                final_code.append(f'M={value}')                 # RAM[*SP+offset]=0 / 1
+            else:
+                final_code += [
+                    f'@{value}',                                # A=constant
+                    'D=A',                                      # D=constant
+                    f'@{stack_pointer}',                        # A=SP
+                    'A=M' if offset == 0 else 'A=M+1',          # A=*SP / *SP+1
+                ]
+                final_code += ['A=A+1'] * (offset - 1)          # A=*SP+offset
+                final_code.append('M=D')                        # RAM[*SP+offset]=constant
+            address_offset = offset
+
+        final_code += self.update_sp_code_by(len(values))
+
+        return final_code
+
+    '''
+        writes pending push constant tokens, as a batch if more than one
+    '''
+    def flush_pending_pushes(self) -> list:
+        pending_pushes = self.PENDING_PUSHES
+        self.PENDING_PUSHES = []
+
+        if len(pending_pushes) == 0:
+            return []
+        if len(pending_pushes) == 1:
+            return self.push_to_segement(pending_pushes[0])
+        return self.create_push_constants_statement([token.variable for token in pending_pushes])
+
     '''
         pop from segment
     '''
@@ -222,6 +375,20 @@ class Stack():
         }
 
         # Jump directives
+        if token.command_type in [4,5,6] and self.COMPACT_COMPARISONS:
+            final_code += [
+                jmp_directive[token.command_type]['desc'],                                  # comment
+                f"@RET_{jmp_directive[token.command_type]['symbol']}.{self.get_label()}",         # A=returnAddress
+                'D=A',                                                                      # D=returnAddress, saved to R13 by routine
+                f"@${jmp_directive[token.command_type]['symbol']}",                         # A=shared comparison routine
+                '1;JMP',                                                                    # jump to shared comparison routine
+                f"(RET_{jmp_directive[token.command_type]['symbol']}.{self.get_label()})",
+            ]
+
+            self.LABEL += 1
+
+            return final_code
+
         if token.command_type in [4,5,6]:
             final_code += [
                 jmp_directive[token.command_type]['desc'],                                  # comment
@@ -239,18 +406,18 @@ class Stack():
             ]
             
             final_code += [
-                f"@ELSE_{jmp_directive[token.command_type]['symbol']}.{self.LABEL}",    # names interval
+                f"@ELSE_{jmp_directive[token.command_type]['symbol']}.{self.get_label()}",    # names interval
                 f"D;{jmp_directive[token.command_type]['symbol']}",                     # creates dynamic JMP based on D value
                 f"@{stack_pointer}",                                                    # A=SP
                 'A=M-1',                                                                # A=*SP--
                 'M=0',                                                                  # RAM[*SP--]=0 if JMP_DIRECTIVE
-                f"@END_IF_{jmp_directive[token.command_type]['symbol']}.{self.LABEL}",  # A=end_if label
+                f"@END_IF_{jmp_directive[token.command_type]['symbol']}.{self.get_label()}",  # A=end_if label
                 '1;JMP',                                                                # Unconditional jmp
-                f"(ELSE_{jmp_directive[token.command_type]['symbol']}.{self.LABEL})",   # Creates ELSE_IF label
+                f"(ELSE_{jmp_directive[token.command_type]['symbol']}.{self.get_label()})",   # Creates ELSE_IF label
                 f"@{stack_pointer}",                                                    # A=*SP
                 'A=M-1',                                                                # A=*SP--
                 'M=-1',                                                                  # RAM[*SP--]=1 if JMP_DIRECTIVE
-                f"(END_IF_{jmp_directive[token.command_type]['symbol']}.{self.LABEL})",
+                f"(END_IF_{jmp_directive[token.command_type]['symbol']}.{self.get_label()})",
             ]
             
             self.LABEL += 1
@@ -398,15 +565,31 @@ class Stack():
             f'({token.segment_pointer})'                                                    # sets start LABEL of function, when call <function_name> is used
         ]
         
+        # zeroes local variables with single SP update, unrolled or with a loop, based on LOCALS_UNROLL_LIMIT
+        if self.BATCH_PUSHES and int(token.variable) > self.LOCALS_UNROLL_LIMIT:
+            final_code += [
+                f'// Zeroes {token.variable} local variables with a loop',
+                f'@{token.variable}',                                                          # A=localVariables
+                'D=A',                                                                          # D=localVariables
+                f'({token.segment_pointer}$ZERO_LOCALS)',
+                f'@{self.SP.index}',                                                            # A=SP
+                'AM=M+1',                                                                       # SP++, A=*SP
+                'A=A-1',                                                                        # A=*SP-1
+                'M=0',                                                                          # RAM[*SP-1]=0
+                f'@{token.segment_pointer}$ZERO_LOCALS',                                        # A=loop label
+                'D=D-1;JGT'                                                                     # loops while there are local variables left
+            ]
+            return final_code
+        if self.BATCH_PUSHES and int(token.variable) > 0:
+            return final_code + self.create_push_constants_statement(['0'] * int(token.variable))
+
         # creates rule that push to stack nArgs (n+1) times 0 constant for LCL segment
         # based on function definition: function <functioName> <localVariables>
         for i in range(int(token.variable)):
             final_code += self.push_to_segement(
                 Token(
-                    command='push constant 0',
-                    tokens=['push','constant','0'],
-                    segment_pointer='CONSTANT',
-                    command_type=1,
+                    segment_pointer=Segment.CONSTANT,
+                    command_type=CommandType.PUSH,
                     variable='0'
                 )
             )
@@ -419,6 +602,9 @@ class Stack():
         <nArgs> are arguments that were pushed to stack prior to calling, in which function will operate on
     '''
     def create_call_statement(self, token: Token) -> list:
+        if self.COMPACT_CALLS:
+            return self.create_compact_call_statement(token)
+
         stack_pointer   = getattr(self,'SP').index
         arg_pointer     = getattr(self,'ARG').index
         lcl_pointer     = getattr(self,'LCL').index
@@ -430,7 +616,7 @@ class Stack():
         # temp, save return address to stack, will be saved in @13, since RAM[13~15] are temp registers
         final_code += [                
             f'// Saves return address to stack',
-            f'@{token.segment_pointer}$ret.{self.LABEL}',                                           # A=returnAddress
+            f'@{token.segment_pointer}$ret.{self.get_label()}',                                           # A=returnAddress
             'D=A',                                                                              # D=*pointer
             f'@{stack_pointer}',                                                                # A=SP
             'A=M',                                                                              # A=*SP
@@ -477,7 +663,37 @@ class Stack():
         final_code += [
             f'@{token.segment_pointer}',                                                        # A=LABEL_NAME
             '1;JMP',                                                                            # jump to function code
-            f'({token.segment_pointer}$ret.{self.LABEL})'
+            f'({token.segment_pointer}$ret.{self.get_label()})'
+        ]
+
+        self.LABEL += 1
+
+        return final_code
+
+    '''
+        creates call that jumps to shared $CALL routine, with
+            R13: return address
+            R14: function address
+            R15: nArgs
+    '''
+    def create_compact_call_statement(self, token: Token) -> list:
+        final_code = [
+            f'// Calls {token.segment_pointer} through shared call routine',
+            f'@{token.segment_pointer}$ret.{self.get_label()}',                                           # A=returnAddress
+            'D=A',                                                                              # D=returnAddress
+            '@13',                                                                              # A=R13
+            'M=D',                                                                              # R13=returnAddress
+            f'@{token.segment_pointer}',                                                        # A=LABEL_NAME
+            'D=A',                                                                              # D=functionAddress
+            '@14',                                                                              # A=R14
+            'M=D',                                                                              # R14=functionAddress
+            f'@{token.variable}',                                                               # A=nArgs
+            'D=A',                                                                              # D=nArgs
+            '@15',                                                                              # A=R15
+            'M=D',                                                                              # R15=nArgs
+            '@$CALL',                                                                           # A=shared call routine
+            '1;JMP',                                                                            # jump to shared call routine
+            f'({token.segment_pointer}$ret.{self.get_label()})'
         ]
 
         self.LABEL += 1
@@ -485,6 +701,20 @@ class Stack():
         return final_code
 
     def create_return_statement(self, token: Token) -> list:
+        if self.COMPACT_CALLS:
+            return [
+                '// Returns through shared return routine',
+                '@$RETURN',                                                                     # A=shared return routine
+                '1;JMP'                                                                         # jump to shared return routine
+            ]
+
+        return self.create_frame_restore_code()
+
+    '''
+        restores caller frame and jumps to return address, RULE:
+            endFrame=LCL, retAddr=*(endFrame-5), *ARG=pop(), SP=ARG+1, THAT/THIS/ARG/LCL=*(endFrame-1..4), goto retAddr
+    '''
+    def create_frame_restore_code(self) -> list:
         stack_pointer   = getattr(self,'SP').index
         arg_pointer     = getattr(self,'ARG').index
         lcl_pointer     = getattr(self,'LCL').index
@@ -520,10 +750,8 @@ class Stack():
         # creates rule that pops stack to argument 0
         final_code += self.pop_from_stack(
             Token(
-                command='pop argument 0',
-                tokens=['pop','argument','0'],
-                segment_pointer='ARG',
-                command_type=0,
+                segment_pointer=Segment.ARG,
+                command_type=CommandType.POP,
                 variable='0'
             )
         )
@@ -564,6 +792,134 @@ class Stack():
 
         return final_code
 
+    '''
+        generates shared $CALL / $RETURN routines used by compact calls, must be emitted once where code never falls through
+        $CALL:
+            push R13 (return address), LCL, ARG, THIS, THAT; ARG=SP-5-R15 (nArgs); LCL=SP; goto R14 (function address)
+        $RETURN:
+            same code of an inlined return statement
+    '''
+    def create_call_return_routines(self) -> list:
+        stack_pointer   = getattr(self,'SP').index
+        arg_pointer     = getattr(self,'ARG').index
+        lcl_pointer     = getattr(self,'LCL').index
+        this_pointer    = getattr(self,'THIS').index
+        that_pointer    = getattr(self,'THAT').index
+        saved_frame     = [lcl_pointer,arg_pointer,this_pointer,that_pointer]
+        final_code      = [
+            '// Shared call routine',
+            '($CALL)',
+            '@13',                                                                              # A=R13
+            'D=M',                                                                              # D=returnAddress
+            f'@{stack_pointer}',                                                                # A=SP
+            'A=M',                                                                              # A=*SP
+            'M=D',                                                                              # RAM[*SP]=returnAddress
+        ]
+
+        final_code += self.update_sp_code(1)                                                    # SP = *SP+1
+
+        for pointer in saved_frame:
+            final_code += [
+                f'// Code to pointer index at {pointer} to stack',
+                f'@{pointer}',                                                                  # A=pointer
+                'D=M',                                                                          # D=*pointer
+                f'@{stack_pointer}',                                                            # A=SP
+                'A=M',                                                                          # A=*SP
+                'M=D',                                                                          # RAM[*SP]=*SP
+            ]
+
+            final_code += self.update_sp_code(1)                                                # SP = *SP+1
+
+        final_code += [
+            f'// Code to set ARG pointer',
+            '@15',                                                                              # A=R15
+            'D=M',                                                                              # D=nArgs
+            '@5',                                                                               # A=savedFrameSize
+            'D=D+A',                                                                            # D=nArgs+savedFrameSize
+            f'@{stack_pointer}',                                                                # A=SP
+            'D=M-D',                                                                            # D=SP-nArgs-savedFrameSize
+            f'@{arg_pointer}',                                                                  # A=ARG
+            'M=D',                                                                              # RAM[ARG]=SP-nArgs-savedFrameSize
+            f'// Code to set LCL pointer to SP value',
+            f'@{stack_pointer}',                                                                # A=SP
+            'D=M',                                                                              # D=*SP
+            f'@{lcl_pointer}',                                                                  # A=LCL
+            'M=D',                                                                              # RAM[LCL]=SP
+            '@14',                                                                              # A=R14
+            'A=M',                                                                              # A=functionAddress
+            '1;JMP',                                                                            # jump to function code
+            '// Shared return routine',
+            '($RETURN)',
+        ]
+
+        final_code += self.create_frame_restore_code()
+
+        return final_code
+
+    '''
+        generates shared $JEQ / $JGT / $JLT routines used by compact comparisons, entered with D=return address
+        rule:
+            R13=D, SP--, *SP-1 = -1 if (*SP-1 - *SP) <JMP_DIRECTIVE> 0 else 0, goto R13
+    '''
+    def create_comparison_routines(self) -> list:
+        stack_pointer   = getattr(self,'SP').index
+        final_code      = []
+
+        for jmp_directive in ['JEQ','JGT','JLT']:
+            final_code += [
+                f'// Shared {jmp_directive} comparison routine',
+                f'(${jmp_directive})',
+                '@13',                                                                          # A=R13
+                'M=D',                                                                          # R13=returnAddress
+                f'@{stack_pointer}',                                                            # A=SP
+                'AM=M-1',                                                                       # SP--, A=*SP
+                'D=M',                                                                          # D=*SP
+                'A=A-1',                                                                        # A=*SP-1
+                'D=M-D',                                                                        # D=*SP-1 - *SP
+                'M=-1',                                                                         # RAM[*SP-1]=-1, kept if JMP_DIRECTIVE
+                '@$COMPARISON_END',                                                             # A=routine end
+                f'D;{jmp_directive}',                                                           # jump if JMP_DIRECTIVE
+                f'@{stack_pointer}',                                                            # A=SP
+                'A=M-1',                                                                        # A=*SP-1
+                'M=0',                                                                          # RAM[*SP-1]=0
+                '@$COMPARISON_END',                                                             # A=routine end
+                '1;JMP',                                                                        # Unconditional jmp
+            ]
+
+        final_code += [
+            '($COMPARISON_END)',
+            '@13',                                                                              # A=R13
+            'A=M',                                                                              # A=returnAddress
+            '1;JMP',                                                                            # jump to returnAddress
+        ]
+
+        return final_code
+
+    '''
+        generates halt loop placed before shared routines when a single file is translated,
+        since there's no Sys.init call keeping the program from running into them
+    '''
+    def create_halt_loop(self) -> list:
+        return [
+            '// Halts before shared routines',
+            '($HALT)',
+            '@$HALT',                                                                           # A=halt loop
+            '0;JMP',                                                                            # Unconditional jmp
+        ]
+
+    '''
+        generates every shared routine enabled by COMPACT_CALLS / COMPACT_COMPARISONS, must be emitted once where code never falls through
+    '''
+    def create_shared_routines(self) -> list:
+        final_code = []
+
+        if self.COMPACT_CALLS:
+            final_code += self.create_call_return_routines()
+        if self.COMPACT_COMPARISONS:
+            final_code += self.create_comparison_routines()
+
+        return final_code
+
     '''
         generates end function code. created to finish function code
     '''
@@ -576,9 +932,149 @@ class Stack():
             f'(END_FUNCTION_{return_label})',                                                # creates end_function label, so code isn't executed when defined
         ]
 
+    '''
+        emits push / pop on LCL, ARG, THIS, THAT and TEMP segments
+    '''
+    def emit_offset_segment(self, token: Token) -> list:
+        comment, code = self.templates[(token.command_type, token.segment_pointer)]
+        return [f'{comment}{token.variable}', f'@{token.variable}'] + code
+
+    def emit_push_constant(self, token: Token) -> list:
+        return [f'// Push to stack, RAM[{self.SP.index}]', f'@{token.variable}'] + self.templates[(CommandType.PUSH, Segment.CONSTANT)]
+
+    def emit_push_static(self, token: Token) -> list:
+        return [f'// Generates STATIC variable {token.file}.{token.variable}', f'@{token.file}.{token.variable}'] + self.templates[(CommandType.PUSH, Segment.STATIC)]
+
+    def emit_pop_static(self, token: Token) -> list:
+        self.STATIC += 1
+        return [
+            f'// Pop from stack into STATIC variable: {token.file}.{token.variable}',
+            f'@{self.SP.index}',
+            'A=M-1',
+            'D=M',
+            f'@{token.file}.{token.variable}'
+        ] + self.templates[(CommandType.POP, Segment.STATIC)]
+
+    def emit_pointer(self, token: Token) -> list:
+        code = self.templates[(token.command_type, Segment.POINTER)].get(token.variable)
+        if code is None:
+            return self.generate_operation_by_type(token)
+        return code[:]
+
+    '''
+        emits commands without token dependent lines: add, sub, neg, not, and, or, inlined return
+    '''
+    def emit_template(self, token: Token) -> list:
+        return self.templates[(token.command_type, None)][:]
+
+    def emit_if_goto(self, token: Token) -> list:
+        return self.templates[(CommandType.IF_GOTO, None)] + [f'@{token.variable}', 'D;JLT']
+
+    '''
+        routes each (command_type, segment) to its emitter, segment being None for commands without one
+        function / call are keyed by (command_type, None), since their segment_pointer holds the function name
+    '''
+    def create_dispatch_table(self):
+        self.dispatch_table = {
+            (CommandType.PUSH, Segment.CONSTANT):   self.emit_push_constant,
+            (CommandType.PUSH, Segment.STATIC):     self.emit_push_static,
+            (CommandType.POP, Segment.STATIC):      self.emit_pop_static,
+            (CommandType.PUSH, Segment.POINTER):    self.emit_pointer,
+            (CommandType.POP, Segment.POINTER):     self.emit_pointer,
+            (CommandType.ADD, None):                self.emit_template,
+            (CommandType.SUB, None):                self.emit_template,
+            (CommandType.EQ, None):                 self.create_conditional_statement,
+            (CommandType.GT, None):                 self.create_conditional_statement,
+            (CommandType.LT, None):                 self.create_conditional_statement,
+            (CommandType.NEG, None):                self.emit_template,
+            (CommandType.AND, None):                self.emit_template,
+            (CommandType.OR, None):                 self.emit_template,
+            (CommandType.NOT, None):                self.emit_template,
+            (CommandType.LABEL, None):              self.create_label_statement,
+            (CommandType.IF_GOTO, None):            self.emit_if_goto,
+            (CommandType.GOTO, None):               self.create_goto_statement,
+            (CommandType.FUNCTION, None):           self.create_function_statement,
+            (CommandType.CALL, None):               self.create_call_statement,
+            (CommandType.RETURN, None):             self.emit_template,
+            (CommandType.END, None):                self.create_end_statement,
+        }
+        for segment in [Segment.LCL, Segment.ARG, Segment.THIS, Segment.THAT, Segment.TEMP]:
+            self.dispatch_table[(CommandType.PUSH, segment)] = self.emit_offset_segment
+            self.dispatch_table[(CommandType.POP, segment)] = self.emit_offset_segment
+
+    '''
+        generates code for token through the dispatch table, push constant tokens are held while BATCH_PUSHES is set,
+        so flush_pending_pushes must be called after the last token
+    '''
     def generate_operation(self, token: Token) -> list:
+        if self.BATCH_PUSHES:
+            if token.command_type == CommandType.PUSH and token.segment_pointer == Segment.CONSTANT:
+                self.PENDING_PUSHES.append(token)
+                return []
+            pending_code = self.flush_pending_pushes()
+            if pending_code:
+                return pending_code + self.generate_operation(token)
+
+        if self.CODE_CACHE is None or token.command_type in UNCACHED_COMMANDS:
+            return self.emit_operation(token)
+        return self.emit_cached_operation(token)
+
+    '''
+        generates code for token preceded by its source marker, see assembler.source_map
+        pending batched pushes are flushed before the marker, so their code belongs to the last push constant
+    '''
+    def generate_mapped_operation(self, token: Token, line: int) -> list:
         final_code = []
-                
+        if self.BATCH_PUSHES and not (token.command_type == CommandType.PUSH and token.segment_pointer == Segment.CONSTANT):
+            final_code += self.flush_pending_pushes()
+        if token.command_type == CommandType.FUNCTION:
+            self.SOURCE_FUNCTION = token.segment_pointer
+
+        origin = SourceOrigin(
+            f'{token.file}.vm',
+            line,
+            self.SOURCE_FUNCTION or '-',
+            CommandType(token.command_type).name.lower().replace('_','-')
+        )
+        return final_code + [create_source_marker(origin)] + self.generate_operation(token)
+
+    def emit_operation(self, token: Token) -> list:
+        emitter = self.dispatch_table.get((token.command_type, token.segment_pointer)) or self.dispatch_table.get((token.command_type, None))
+        if emitter is None:
+            return self.generate_operation_by_type(token)
+        return emitter(token)
+
+    '''
+        emits code through CODE_CACHE, replaying LABEL / STATIC updates of the cached emission on hits
+        function / end are never cached, since they update FUNCTION_LABELS / FUNCTION_DEFINITION,
+        nor label / goto / if-goto, since each label name is used once or twice
+    '''
+    def emit_cached_operation(self, token: Token) -> list:
+        entry = self.CODE_CACHE.lookup(token)
+        if entry is not None:
+            _, _, label_increment, static_increment = entry
+            if not label_increment:
+                self.STATIC += static_increment
+                return self.CODE_CACHE.render(entry)
+            code = self.CODE_CACHE.render(entry, self.get_label())
+            self.LABEL += label_increment
+            return code
+
+        label, label_count, static_count = self.get_label(), self.LABEL, self.STATIC
+        self.EMITTING_TEMPLATE = True
+        try:
+            code = self.emit_operation(token)
+        finally:
+            self.EMITTING_TEMPLATE = False
+        entry = self.CODE_CACHE.store(token, code, self.LABEL - label_count, self.STATIC - static_count)
+        return self.CODE_CACHE.render(entry, label)
+
+    '''
+        generates code for token by checking its command type one by one, reference for the dispatch table emitters
+    '''
+    def generate_operation_by_type(self, token: Token) -> list:
+        final_code = []
+
         if token.command_type == 0:                 # pop
             final_code += self.pop_from_stack(token)
         if token.command_type == 1:                 # push
@@ -1,16 +1,88 @@
 # std-lib import
 from dataclasses import dataclass
 from distutils import command
+from enum import Enum, IntEnum
+from types import MappingProxyType
 import re
 
-@dataclass
+class CommandType(IntEnum):
+    POP         = 0
+    PUSH        = 1
+    ADD         = 2
+    SUB         = 3
+    EQ          = 4
+    GT          = 5
+    LT          = 6
+    NEG         = 7
+    AND         = 8
+    OR          = 9
+    NOT         = 10
+    LABEL       = 11
+    IF_GOTO     = 12
+    GOTO        = 13
+    FUNCTION    = 14
+    CALL        = 15
+    RETURN      = 16
+    END         = 17
+
+'''
+    Memory segments, members compare and format as their Stack attribute name
+'''
+class Segment(str, Enum):
+    LCL         = 'LCL'
+    CONSTANT    = 'CONSTANT'
+    ARG         = 'ARG'
+    THIS        = 'THIS'
+    THAT        = 'THAT'
+    TEMP        = 'TEMP'
+    STATIC      = 'STATIC'
+    POINTER     = 'POINTER'
+
+    def __str__(self):
+        return self.value
+
+# command -> (expression type, command type), expression types follow Tokenizer.expression_type
+COMMAND_TABLE = MappingProxyType({
+    'pop':      (1, CommandType.POP),
+    'push':     (1, CommandType.PUSH),
+    'add':      (2, CommandType.ADD),
+    'sub':      (2, CommandType.SUB),
+    'eq':       (2, CommandType.EQ),
+    'gt':       (2, CommandType.GT),
+    'lt':       (2, CommandType.LT),
+    'neg':      (2, CommandType.NEG),
+    'and':      (2, CommandType.AND),
+    'or':       (2, CommandType.OR),
+    'not':      (2, CommandType.NOT),
+    'label':    (3, CommandType.LABEL),
+    'if-goto':  (3, CommandType.IF_GOTO),
+    'goto':     (3, CommandType.GOTO),
+    'function': (4, CommandType.FUNCTION),
+    'call':     (4, CommandType.CALL),
+    'return':   (4, CommandType.RETURN),
+    'end':      (4, CommandType.END),
+})
+
+SEGMENT_TABLE = MappingProxyType({
+    'local':    Segment.LCL,
+    'constant': Segment.CONSTANT,
+    'argument': Segment.ARG,
+    'this':     Segment.THIS,
+    'that':     Segment.THAT,
+    'temp':     Segment.TEMP,
+    'static':   Segment.STATIC,
+    'pointer':  Segment.POINTER
+})
+
+'''
+    Immutable VM command, segment_pointer holds the Segment for push / pop and the function name for function / call
+'''
+@dataclass(frozen=True, slots=True)
 class Token():
-    file:               str     = None
-    command:            str     = None
-    tokens:             list    = None
-    segment_pointer:    str     = None
-    command_type:       int     = 0
-    variable:           str     = None
+    file:               str         = None
+    segment_pointer:    str         = None
+    command_type:       CommandType = CommandType.POP
+    variable:           str         = None
 
 @dataclass
 class Tokenizer:
@@ -27,8 +99,6 @@ class Tokenizer:
         if self.expression_type() == 1:
             self.token = Token(
                 file=self.file,
-                command=self.command,
-                tokens=self.tokens,
                 segment_pointer=self.get_memory_segment(self.tokens[1]),
                 command_type=self.get_command_type(self.tokens[0]),
                 variable=self.tokens[2],
@@ -37,8 +107,6 @@ class Tokenizer:
         if self.expression_type() == 2:
             self.token = Token(
                 file=self.file,
-                command=self.command,
-                tokens=self.tokens,
                 segment_pointer=None,
                 command_type=self.get_command_type(self.tokens[0]),
                 variable=None,
@@ -47,8 +115,6 @@ class Tokenizer:
         if self.expression_type() == 3:            
             self.token = Token(
                 file=self.file,
-                command=self.command,
-                tokens=self.tokens,
                 segment_pointer=None,
                 command_type=self.get_command_type(self.tokens[0]),
                 variable=self.tokens[1],
@@ -57,8 +123,6 @@ class Tokenizer:
         if self.expression_type() == 4:
             self.token = Token(
                 file=self.file,
-                command=self.command,
-                tokens=self.tokens,
                 segment_pointer=self.tokens[1] if len(self.tokens)>1 else None,
                 command_type=self.get_command_type(self.tokens[0]),
                 variable=self.tokens[2] if len(self.tokens)>2 else None,
@@ -124,7 +188,7 @@ class Tokenizer:
             'return':   16,
             'end':      17
         }
-        return mapping[command]
+        return CommandType(mapping[command])
 
     def get_memory_segment(self, segment: str):
         mapping = {
@@ -138,4 +202,38 @@ class Tokenizer:
             'pointer':  'POINTER'
         }
 
-        return mapping[segment]
\ No newline at end of file
+        return Segment(mapping[segment])
+
+'''
+    Tokenizes command without regex, creating the same Token as Tokenizer
+    code is cut at the last '//', split on whitespace once and dispatched through COMMAND_TABLE
+    return:
+        Token -> None if command is empty, a comment or an unknown command
+'''
+def tokenize_command(file: str, command: str) -> Token:
+    comment_index = command.rfind('//')
+    tokens = (command[:comment_index] if comment_index >= 0 else command).split()
+    if not tokens:
+        return None
+
+    command_types = COMMAND_TABLE.get(tokens[0])
+    if command_types is None:
+        return None
+
+    expression_type, command_type = command_types
+    # push / pop tokens
+    if expression_type == 1:
+        return Token(file, SEGMENT_TABLE[tokens[1]], command_type, tokens[2])
+    # expression tokens
+    if expression_type == 2:
+        return Token(file, None, command_type, None)
+    # branching / label tokens
+    if expression_type == 3:
+        return Token(file, None, command_type, tokens[1])
+    # function tokens
+    return Token(
+        file,
+        tokens[1] if len(tokens)>1 else None,
+        command_type,
+        tokens[2] if len(tokens)>2 else None
+    )
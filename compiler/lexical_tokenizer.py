@@ -2,7 +2,7 @@ import re
 from dataclasses import dataclass, field
 from typing import Optional
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LexicToken:
     type: str
     value: Optional[str] = None